@@ -5,38 +5,295 @@
 
 import os
 import io
-import re
-import csv
+import asyncio
+import itertools
 import json
-import zipfile
-import concurrent.futures
-import requests
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterator, Optional, List, Tuple
 from urllib.parse import urlparse
 
 from flask import (
     Flask,
+    Response,
     render_template,
     request,
     redirect,
     url_for,
     send_file,
     flash,
+    stream_with_context,
 )
 
+from scraper.checkpoints import discard_checkpoint
+from scraper.client import get_http_cache_stats, get_pool_stats
+from scraper.detail_index import get_detail_index_stats
+from scraper.imagestore import get_image_store, get_image_store_stats
+from scraper.metrics import render_metrics
+from scraper.profiling import ProfileStore, ScrapeProfiler, top_functions
+from scraper.politeness import get_scheduler
+from scraper.robots import get_robots_cache
 from scraper.core import (
+    create_session,
+    get_user_agent_stats,
     is_allowed_by_robots,
+    iter_batch,
+    iter_items,
+    parse_fields,
     scrape_with_selector,
     scrape_paginated,
+    ScrapeItem,
     ScrapeResult,
 )
 
+from scraper.jobs import Job, JobManager
+from scraper.cache import CachedResult, ResultCache, make_result_key
+from scraper.exporters import CSV_FIELDS, iter_csv, iter_image_zip, iter_json_array, iter_ndjson
 from scraper.presets import load_presets_any, save_or_update_preset, delete_preset
 
+TRUTHY_VALUES = {"1", "true", "on", "yes"}
+
+def _optional_int(raw: str) -> Optional[int]:
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+def _optional_float(raw: str) -> Optional[float]:
+    try:
+        value = float(raw) if raw else None
+    except ValueError:
+        return None
+    return value if value is not None and value > 0 else None
+
+def _fields_arg(raw: str) -> Optional[str]:
+    # Canonical order keeps "href,text" and "text,href" on one cache key
+    try:
+        fields = parse_fields(raw)
+    except ValueError:
+        return raw  # The scrape itself reports the bad name
+    return ",".join(fields) if fields else None
+
+# Shared query string parsing for /results, /export and /download-all-images
+def parse_scrape_args(args) -> Dict[str, Any]:
+    return {
+        "url": args.get("url", "").strip(),
+        "selector_type": args.get("selector_type", "css").strip().lower(),
+        "selector": args.get("selector", "").strip(),
+        "attribute": args.get("attribute", "").strip() or None,
+        "user_agent": args.get("user_agent", "").strip() or None,
+        "max_items": _optional_int(args.get("max_items", "").strip()),
+        "fast_mode": args.get("fast_mode", "").strip().lower() in TRUTHY_VALUES,
+        "next_selector": args.get("next_selector", "").strip() or None,
+        "max_pages": _optional_int(args.get("max_pages", "").strip()),
+        "detail_url_selector": args.get("detail_url_selector", "").strip() or None,
+        "detail_url_attribute": args.get("detail_url_attribute", "").strip() or "href",
+        "detail_image_selector": args.get("detail_image_selector", "").strip() or None,
+        "detail_image_attribute": args.get("detail_image_attribute", "").strip() or "src",
+        "respect_robots": args.get("respect_robots", "1").strip().lower() in TRUTHY_VALUES,
+        "randomize_user_agent": args.get("randomize_user_agent", "").strip().lower() in TRUTHY_VALUES,
+        "page_url_template": args.get("page_url_template", "").strip() or None,
+        "page_start": _optional_int(args.get("page_start", "").strip()),
+        "page_window": _optional_int(args.get("page_window", "").strip()),
+        "engine": args.get("engine", "").strip().lower() or "threads",
+        "lean_parse": args.get("lean_parse", "").strip().lower() in TRUTHY_VALUES,
+        "rate_limit": _optional_float(args.get("rate_limit", "").strip()),
+        "fields": _fields_arg(args.get("fields", "").strip()),
+    }
+
+def to_query_args(params: Dict[str, Any]) -> Dict[str, str]:
+    # Inverse of parse_scrape_args, for building links back to /results
+    return {
+        name: ("1" if value else "0") if isinstance(value, bool) else str(value)
+        for name, value in params.items()
+        if value not in (None, "")
+    }
+
+def run_scrape(
+    params: Dict[str, Any],
+    is_canceled: Optional[Callable[[], bool]] = None,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    resume: bool = True,
+) -> ScrapeResult:
+    common = dict(
+        url=params["url"],
+        selector_type=params["selector_type"],
+        selector=params["selector"],
+        attribute_name=params["attribute"],
+        user_agent=(None if params["randomize_user_agent"] else params["user_agent"]),
+        max_items=params["max_items"],
+        fast_mode=params["fast_mode"],
+        is_canceled=is_canceled,
+        progress_cb=progress_cb,
+        detail_url_selector=params["detail_url_selector"],
+        detail_url_attribute=params["detail_url_attribute"],
+        detail_image_selector=params["detail_image_selector"],
+        detail_image_attribute=params["detail_image_attribute"],
+        lean_parse=params["lean_parse"],
+        respect_robots=params["respect_robots"],
+        rate_limit=params["rate_limit"],
+        fields=params["fields"],
+    )
+    paginated = bool(params["next_selector"] or params["max_pages"] or params["page_url_template"])
+    pagination = dict(
+        next_selector=params["next_selector"],
+        max_pages=params["max_pages"],
+        page_url_template=params["page_url_template"],
+        page_start=params["page_start"] if params["page_start"] is not None else 1,
+        page_window=params["page_window"] or 4,
+    )
+    if params["engine"] == "async":
+        # Imported lazily so the default engine works without aiohttp installed
+        from scraper import async_core
+        if paginated:
+            return asyncio.run(async_core.scrape_paginated(**pagination, **common))
+        return asyncio.run(async_core.scrape_with_selector(**common))
+    if paginated:
+        # A paginated run that died part way picks up from its checkpoint
+        checkpoint_id = make_result_key(params)
+        if not resume:
+            discard_checkpoint(checkpoint_id)
+        return scrape_paginated(**pagination, **common, checkpoint_id=checkpoint_id)
+    return scrape_with_selector(**common)
+
+def iter_scrape_items(
+    params: Dict[str, Any],
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    finished_cb: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> Iterator[ScrapeItem]:
+    # Same scrape as run_scrape, but items come out page by page as they are found
+    if params["engine"] == "async":
+        result = run_scrape(params, progress_cb=progress_cb)
+        if finished_cb:
+            finished_cb(result.elapsed_ms, result.timings or {})
+        return iter(result.items)
+    return iter_items(
+        url=params["url"],
+        selector_type=params["selector_type"],
+        selector=params["selector"],
+        next_selector=params["next_selector"],
+        attribute_name=params["attribute"],
+        user_agent=(None if params["randomize_user_agent"] else params["user_agent"]),
+        max_items=params["max_items"],
+        max_pages=params["max_pages"],
+        fast_mode=params["fast_mode"],
+        detail_url_selector=params["detail_url_selector"],
+        detail_url_attribute=params["detail_url_attribute"],
+        detail_image_selector=params["detail_image_selector"],
+        detail_image_attribute=params["detail_image_attribute"],
+        page_url_template=params["page_url_template"],
+        page_start=params["page_start"] if params["page_start"] is not None else 1,
+        page_window=params["page_window"] or 4,
+        lean_parse=params["lean_parse"],
+        respect_robots=params["respect_robots"],
+        rate_limit=params["rate_limit"],
+        fields=params["fields"],
+        progress_cb=progress_cb,
+        finished_cb=finished_cb,
+    )
+
+def peek_first(items: Iterator[ScrapeItem]) -> Tuple[Optional[ScrapeItem], Iterator[ScrapeItem]]:
+    # Pull the first item before a response starts, so errors on the first page still surface as errors
+    first = next(items, None)
+    if first is None:
+        return None, iter(())
+    return first, itertools.chain([first], items)
+
 # Flask route handlers
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
+    app.config.setdefault("RESULT_CACHE_MAX_ENTRIES", int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "32")))
+    app.config.setdefault("RESULT_CACHE_MAX_ITEMS", int(os.environ.get("RESULT_CACHE_MAX_ITEMS", "200000")))
+    app.config.setdefault("RESULT_CACHE_TTL", float(os.environ.get("RESULT_CACHE_TTL", "900")))
+
+    # Finished scrapes, so export and ZIP links never hit the target site again
+    result_cache = ResultCache(
+        max_entries=app.config["RESULT_CACHE_MAX_ENTRIES"],
+        max_total_items=app.config["RESULT_CACHE_MAX_ITEMS"],
+        ttl_seconds=app.config["RESULT_CACHE_TTL"],
+    )
+    app.extensions["result_cache"] = result_cache
+
+    app.config.setdefault("JOB_WORKERS", int(os.environ.get("JOB_WORKERS", "4")))
+    app.config.setdefault("PROFILING_ENABLED", os.environ.get("SCRAPER_PROFILING", "").strip().lower() in TRUTHY_VALUES)
+    app.config.setdefault("PROFILE_DIR", os.environ.get("SCRAPER_PROFILE_DIR", os.path.join(".cache", "profiles")))
+    app.config.setdefault("PROFILE_MAX_ENTRIES", int(os.environ.get("SCRAPER_PROFILE_MAX_ENTRIES", "50")))
+
+    # cProfile output of scrapes run with profile=1, one per result id
+    profile_store = ProfileStore(app.config["PROFILE_DIR"], max_entries=app.config["PROFILE_MAX_ENTRIES"])
+    app.extensions["profile_store"] = profile_store
+
+    app.config.setdefault("BATCH_WORKERS", int(os.environ.get("BATCH_WORKERS", "16")))
+    app.config.setdefault("BATCH_MAX_URLS", int(os.environ.get("BATCH_MAX_URLS", "2000")))
+
+    # Background scrapes, polled or streamed over server-sent events
+    job_manager = JobManager(max_workers=app.config["JOB_WORKERS"])
+    app.extensions["job_manager"] = job_manager
+
+    def lookup_cached(params: Dict[str, Any]) -> Optional[CachedResult]:
+        # Keyed on the query alone, so a stored result is only served to the same scrape
+        cached = result_cache.get(make_result_key(params))
+        if cached is None and params["fields"]:
+            # A full result covers any projection of it
+            cached = result_cache.get(make_result_key(dict(params, fields=None)))
+        return cached
+
+    def iter_and_cache(scrape_params: Dict[str, Any]) -> Iterator[ScrapeItem]:
+        # A streamed scrape that runs to the end is stored like any other, so the next export or ZIP reuses it.
+        # Its time comes from the scrape itself, not from how fast the client read the response.
+        events: List[dict] = []
+        finished: Dict[str, Any] = {}
+        def on_finished(elapsed_ms: int, timings: Dict[str, Any]) -> None:
+            finished.update(elapsed_ms=elapsed_ms, timings=timings)
+        collected: List[ScrapeItem] = []
+        for item in iter_scrape_items(scrape_params, progress_cb=events.append, finished_cb=on_finished):
+            collected.append(item)
+            yield item
+        result_cache.put(make_result_key(scrape_params), ScrapeResult(
+            url=scrape_params["url"],
+            selector=scrape_params["selector"],
+            selector_type=scrape_params["selector_type"],
+            items=collected,
+            elapsed_ms=finished.get("elapsed_ms", 0),
+            timings=finished.get("timings"),
+        ), events)
+
+    def wants_profile() -> bool:
+        return bool(app.config["PROFILING_ENABLED"]) and request.args.get("profile", "").strip().lower() in TRUTHY_VALUES
+
+    def profiled_scrape(params: Dict[str, Any], profile: bool, **kwargs: Any) -> ScrapeResult:
+        # With profile on, the profile is kept under the result id, even if the scrape fails
+        if not profile:
+            return run_scrape(params, **kwargs)
+        profiler = ScrapeProfiler()
+        try:
+            with profiler:
+                return run_scrape(params, **kwargs)
+        finally:
+            profile_store.save(make_result_key(params), profiler.stats())
+
+    def submit_scrape_job(params: Dict[str, Any], profile: bool = False, resume: bool = True) -> Job:
+        def target(is_canceled: Callable[[], bool], progress_cb: Callable[[Dict[str, Any]], None]) -> str:
+            if params["respect_robots"] and not is_allowed_by_robots(params["url"], params["user_agent"] or "scraper-webUI"):
+                raise ValueError("Scraping is disallowed by robots.txt for the provided URL.")
+            events: List[dict] = []
+            def track_the_journey(event: dict) -> None:
+                events.append(event)
+                progress_cb(event)
+            result = profiled_scrape(params, profile, is_canceled=is_canceled, progress_cb=track_the_journey, resume=resume)
+            # The job's outcome is the result id, the result itself lives in the cache
+            return result_cache.put(make_result_key(params), result, events)
+        return job_manager.submit(target, params)
+
+    def job_payload(job: Job) -> Dict[str, Any]:
+        payload = job.to_dict()
+        payload["status_url"] = url_for("job_status", job_id=job.id)
+        payload["events_url"] = url_for("job_events", job_id=job.id)
+        payload["cancel_url"] = url_for("job_cancel", job_id=job.id)
+        if job.result:
+            # The results page finds the stored result again through its query key
+            payload["result_id"] = job.result
+            payload["results_url"] = url_for("results", job=job.id, **to_query_args(job.params))
+        return payload
 
     @app.route("/", methods=["GET", "POST"])
     def index():
@@ -50,12 +307,17 @@ def create_app() -> Flask:
             fast_mode = request.form.get("fast_mode") is not None
             randomize_user_agent = request.form.get("randomize_user_agent") is not None
             next_selector = request.form.get("next_selector", "").strip()
+            page_url_template = request.form.get("page_url_template", "").strip()
             max_pages = request.form.get("max_pages", "").strip()
             detail_url_selector = request.form.get("detail_url_selector", "").strip()
             detail_url_attribute = request.form.get("detail_url_attribute", "").strip()
             detail_image_selector = request.form.get("detail_image_selector", "").strip()
             detail_image_attribute = request.form.get("detail_image_attribute", "").strip()
             respect_robots = request.form.get("respect_robots") is not None
+            background = request.form.get("background") is not None
+            lean_parse = request.form.get("lean_parse") is not None
+            rate_limit = request.form.get("rate_limit", "").strip()
+            engine = request.form.get("engine", "").strip().lower()
 
             if not target_url:
                 flash("Please provide a URL to scrape.", "error")
@@ -80,6 +342,8 @@ def create_app() -> Flask:
                 query_args["next_selector"] = next_selector
             if max_pages.isdigit():
                 query_args["max_pages"] = max_pages
+            if page_url_template:
+                query_args["page_url_template"] = page_url_template
             if fast_mode:
                 query_args["fast_mode"] = "1"
             if randomize_user_agent:
@@ -92,6 +356,14 @@ def create_app() -> Flask:
                 query_args["detail_image_selector"] = detail_image_selector
             if detail_image_attribute:
                 query_args["detail_image_attribute"] = detail_image_attribute
+            if background:
+                query_args["background"] = "1"
+            if lean_parse:
+                query_args["lean_parse"] = "1"
+            if _optional_float(rate_limit):
+                query_args["rate_limit"] = rate_limit
+            if engine == "async":
+                query_args["engine"] = engine
 
             return redirect(url_for("results", **query_args))
 
@@ -120,40 +392,96 @@ def create_app() -> Flask:
         except Exception as exc:
             return {"ok": False, "error": str(exc)}, 400
 
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        return {
+            "http_pool": get_pool_stats(),
+            "http_cache": get_http_cache_stats(),
+            "detail_index": get_detail_index_stats(),
+            "image_store": get_image_store_stats(),
+            "robots": get_robots_cache().stats(),
+            "hosts": get_scheduler().stats(),
+            "result_cache": result_cache.stats(),
+            "jobs": job_manager.stats(),
+            "user_agents": get_user_agent_stats(),
+        }
+
+    # Prometheus text format, aggregated over every scrape this process ran
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    # Background jobs
+    @app.route("/jobs", methods=["POST"])
+    def job_submit():
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            source = {k: "" if v is None else str(v) for k, v in data.items()}
+        else:
+            source = request.values
+        params = parse_scrape_args(source)
+        if not params["url"] or not params["selector"]:
+            return {"ok": False, "error": "URL and selector are required."}, 400
+        job = submit_scrape_job(params, resume=not source.get("refresh"))
+        return {"ok": True, "job": job_payload(job)}, 202
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id: str):
+        job = job_manager.get(job_id)
+        if job is None:
+            return {"ok": False, "error": "Unknown job"}, 404
+        return {"ok": True, "job": job_payload(job)}
+
+    @app.route("/jobs/<job_id>/events", methods=["GET"])
+    def job_events(job_id: str):
+        job = job_manager.get(job_id)
+        if job is None:
+            return {"ok": False, "error": "Unknown job"}, 404
+        try:
+            since = int(request.headers.get("Last-Event-ID", request.args.get("since", "0")))
+        except ValueError:
+            since = 0
+        def stream():
+            sent = max(0, since)
+            while True:
+                events, finished = job_manager.wait_for_events(job, sent, timeout=15.0)
+                for event in events:
+                    yield f"id: {sent + 1}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                    sent += 1
+                if finished and not events:
+                    yield f"event: end\ndata: {json.dumps(job_payload(job), ensure_ascii=False)}\n\n"
+                    return
+                if not events:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/jobs/<job_id>/cancel", methods=["POST"])
+    def job_cancel(job_id: str):
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return {"ok": False, "error": "Unknown job"}, 404
+        return {"ok": True, "job": job_payload(job)}
+
     # Results page
     @app.route("/results", methods=["GET"])
     def results():
-        target_url = request.args.get("url", "").strip()
-        selector_type = request.args.get("selector_type", "css").strip().lower()
-        selector = request.args.get("selector", "").strip()
-        attribute = request.args.get("attribute", "").strip() or None
-        user_agent = request.args.get("user_agent", "").strip() or None
-        max_items_raw = request.args.get("max_items", "").strip()
-        fast_mode = (request.args.get("fast_mode", "").strip().lower() in {"1", "true", "on", "yes"})
-        next_selector = request.args.get("next_selector", "").strip() or None
-        max_pages_raw = request.args.get("max_pages", "").strip()
-        detail_url_selector = request.args.get("detail_url_selector", "").strip() or None
-        detail_url_attribute = request.args.get("detail_url_attribute", "").strip() or "href"
-        detail_image_selector = request.args.get("detail_image_selector", "").strip() or None
-        detail_image_attribute = request.args.get("detail_image_attribute", "").strip() or "src"
-        respect_raw = request.args.get("respect_robots", "1").strip().lower()
-        respect_robots = respect_raw in {"1", "true", "yes", "on"}
-        randomize_user_agent = (request.args.get("randomize_user_agent", "").strip().lower() in {"1", "true", "on", "yes"})
-
-        try:
-            max_items: Optional[int] = int(max_items_raw) if max_items_raw else None
-        except ValueError:
-            max_items = None
-        try:
-            max_pages: Optional[int] = int(max_pages_raw) if max_pages_raw else None
-        except ValueError:
-            max_pages = None
+        params = parse_scrape_args(request.args)
 
         error_message: Optional[str] = None
         result: Optional[ScrapeResult] = None
+        result_id: Optional[str] = None
         breadcrumb_trail: List[dict] = []
+        profile = wants_profile()
+        profiled = False  # This request ran the scrape under the profiler
+        profile_rows: Optional[List[Dict[str, Any]]] = None
 
-        if not target_url or not selector:
+        if not params["url"] or not params["selector"]:
             error_message = "URL and selector are required."
         else:
             try:
@@ -161,174 +489,205 @@ def create_app() -> Flask:
                     return False
                 def track_the_journey(event: dict) -> None:
                     breadcrumb_trail.append(event)
-                if respect_robots and not is_allowed_by_robots(target_url, user_agent or "scraper-webUI"):
+                result_id = make_result_key(params)
+                # Checked before the cache too, robots.txt may have changed since
+                blocked = params["respect_robots"] and not is_allowed_by_robots(params["url"], params["user_agent"] or "scraper-webUI")
+                # A profile needs a real run, not the cached result
+                cached = None if blocked or request.args.get("refresh") or profile else lookup_cached(params)
+                if blocked:
                     error_message = "Scraping is disallowed by robots.txt for the provided URL."
+                elif cached is not None:
+                    result = cached.result
+                    breadcrumb_trail = cached.progress_events
+                elif request.args.get("background", "").strip().lower() in TRUTHY_VALUES:
+                    job = submit_scrape_job(params, profile=profile, resume=not request.args.get("refresh"))
+                    return render_template("job.html", job=job_payload(job), query=params)
                 else:
-                    if next_selector or max_pages:
-                        result = scrape_paginated(
-                            url=target_url,
-                            selector_type=selector_type,
-                            selector=selector,
-                            next_selector=next_selector,
-                            attribute_name=attribute,
-                            user_agent=(None if randomize_user_agent else user_agent),
-                            max_items=max_items,
-                            max_pages=max_pages,
-                            fast_mode=fast_mode,
-                            is_canceled=is_canceled,
-                            progress_cb=track_the_journey,
-                            detail_url_selector=detail_url_selector,
-                            detail_url_attribute=detail_url_attribute,
-                            detail_image_selector=detail_image_selector,
-                            detail_image_attribute=detail_image_attribute,
-                        )
-                    else:
-                        result = scrape_with_selector(
-                            url=target_url,
-                            selector_type=selector_type,
-                            selector=selector,
-                            attribute_name=attribute,
-                            user_agent=(None if randomize_user_agent else user_agent),
-                            max_items=max_items,
-                            fast_mode=fast_mode,
-                            is_canceled=is_canceled,
-                            progress_cb=track_the_journey,
-                            detail_url_selector=detail_url_selector,
-                            detail_url_attribute=detail_url_attribute,
-                            detail_image_selector=detail_image_selector,
-                            detail_image_attribute=detail_image_attribute,
-                        )
+                    result = profiled_scrape(
+                        params,
+                        profile,
+                        is_canceled=is_canceled,
+                        progress_cb=track_the_journey,
+                        resume=not request.args.get("refresh"),
+                    )
+                    profiled = profile
+                    result_cache.put(result_id, result, breadcrumb_trail)
             except Exception as exc:
                 error_message = f"Error while scraping: {exc}"
 
+        if app.config["PROFILING_ENABLED"] and result is not None and result_id and not profiled:
+            # A cached result only shows a profile captured by the background job it came from
+            job = job_manager.get(request.args.get("job", ""))
+            if job is not None and job.result == result_id and job.started_at is not None:
+                captured_at = profile_store.captured_at(result_id)
+                profiled = captured_at is not None and captured_at >= job.started_at
+        if profiled and result is not None and result_id:
+            stats = profile_store.load(result_id)
+            if stats is not None:
+                profile_rows = top_functions(stats)
+
         return render_template(
             "results.html",
             query={
-                "url": target_url,
-                "selector_type": selector_type,
-                "selector": selector,
-                "attribute": attribute or "",
-                "user_agent": user_agent or "",
-                "max_items": max_items or "",
-                "next_selector": next_selector or "",
-                "max_pages": max_pages or "",
-                "fast_mode": fast_mode,
-                "detail_url_selector": detail_url_selector or "",
-                "detail_url_attribute": detail_url_attribute or "",
-                "detail_image_selector": detail_image_selector or "",
-                "detail_image_attribute": detail_image_attribute or "",
-                "respect_robots": respect_robots,
-                "randomize_user_agent": randomize_user_agent,
+                "url": params["url"],
+                "selector_type": params["selector_type"],
+                "selector": params["selector"],
+                "attribute": params["attribute"] or "",
+                "user_agent": params["user_agent"] or "",
+                "max_items": params["max_items"] or "",
+                "next_selector": params["next_selector"] or "",
+                "max_pages": params["max_pages"] or "",
+                "page_url_template": params["page_url_template"] or "",
+                "page_start": params["page_start"] if params["page_start"] is not None else "",
+                "page_window": params["page_window"] or "",
+                "fast_mode": params["fast_mode"],
+                "detail_url_selector": params["detail_url_selector"] or "",
+                "detail_url_attribute": params["detail_url_attribute"] or "",
+                "detail_image_selector": params["detail_image_selector"] or "",
+                "detail_image_attribute": params["detail_image_attribute"] or "",
+                "respect_robots": params["respect_robots"],
+                "randomize_user_agent": params["randomize_user_agent"],
+                "lean_parse": params["lean_parse"],
+                "engine": params["engine"],
+                "rate_limit": params["rate_limit"] or "",
+                "fields": params["fields"] or "",
             },
             result=result,
+            result_id=result_id,
             error_message=error_message,
             progress_events=breadcrumb_trail,
+            profile_rows=profile_rows,
         )
 
+    @app.route("/profiles/<profile_id>.pstats", methods=["GET"])
+    def download_profile(profile_id: str):
+        path = profile_store.path(profile_id) if app.config["PROFILING_ENABLED"] else None
+        if path is None or not os.path.exists(path):
+            return {"ok": False, "error": "Unknown profile"}, 404
+        # Open with pstats.Stats(path) or snakeviz
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=f"scrape-{profile_id}.pstats")
+
     # Export functionality
     @app.route("/export", methods=["GET"])
     def export():
         export_format = request.args.get("format", "csv").strip().lower()
-        target_url = request.args.get("url", "").strip()
-        selector_type = request.args.get("selector_type", "css").strip().lower()
-        selector = request.args.get("selector", "").strip()
-        attribute = request.args.get("attribute", "").strip() or None
-        user_agent = request.args.get("user_agent", "").strip() or None
-        max_items_raw = request.args.get("max_items", "").strip()
-        fast_mode = (request.args.get("fast_mode", "").strip().lower() in {"1", "true", "on", "yes"})
-        next_selector = request.args.get("next_selector", "").strip() or None
-        max_pages_raw = request.args.get("max_pages", "").strip()
-        detail_url_selector = request.args.get("detail_url_selector", "").strip() or None
-        detail_url_attribute = request.args.get("detail_url_attribute", "").strip() or "href"
-        detail_image_selector = request.args.get("detail_image_selector", "").strip() or None
-        detail_image_attribute = request.args.get("detail_image_attribute", "").strip() or "src"
-        respect_raw = request.args.get("respect_robots", "1").strip().lower()
-        respect_robots = respect_raw in {"1", "true", "yes", "on"}
-        randomize_user_agent = (request.args.get("randomize_user_agent", "").strip().lower() in {"1", "true", "on", "yes"})
-
-        try:
-            max_items: Optional[int] = int(max_items_raw) if max_items_raw else None
-        except ValueError:
-            max_items = None
-        try:
-            max_pages: Optional[int] = int(max_pages_raw) if max_pages_raw else None
-        except ValueError:
-            max_pages = None
+        params = parse_scrape_args(request.args)
 
-        if not target_url or not selector:
+        if not params["url"] or not params["selector"]:
             flash("URL and selector are required to export.", "error")
             return redirect(url_for("index"))
 
-        if respect_robots and not is_allowed_by_robots(target_url, user_agent or "scraper-webUI"):
+        if params["respect_robots"] and not is_allowed_by_robots(params["url"], params["user_agent"] or "scraper-webUI"):
             flash("Export blocked by robots.txt.", "error")
             return redirect(url_for("index"))
 
-        def nobody_canceled_yet() -> bool:
-            return False
-
-        if next_selector or max_pages:
-            result = scrape_paginated(
-                url=target_url,
-                selector_type=selector_type,
-                selector=selector,
-                next_selector=next_selector,
-                attribute_name=attribute,
-                user_agent=(None if randomize_user_agent else user_agent),
-                max_items=max_items,
-                max_pages=max_pages,
-                fast_mode=fast_mode,
-                is_canceled=nobody_canceled_yet,
-                detail_url_selector=detail_url_selector,
-                detail_url_attribute=detail_url_attribute,
-                detail_image_selector=detail_image_selector,
-                detail_image_attribute=detail_image_attribute,
-            )
+        # Columns written: the requested fields, else everything the format has room for
+        try:
+            fields = parse_fields(params["fields"])
+        except ValueError as exc:
+            flash(f"Export failed: {exc}", "error")
+            return redirect(url_for("index"))
+        columns: Optional[List[str]] = list(fields) if fields else None
+        if export_format != "json" and columns is None:
+            columns = list(CSV_FIELDS)
+        # Only compute the columns that end up in the file
+        scrape_params = dict(params, fields=",".join(columns) if columns else None)
+        cached = lookup_cached(params) or result_cache.get(make_result_key(scrape_params))
+
+        # Without a stored result, rows go out while later pages are still being scraped
+        if cached is not None:
+            items: Iterator[ScrapeItem] = iter(cached.result.items)
         else:
-            result = scrape_with_selector(
-                url=target_url,
-                selector_type=selector_type,
-                selector=selector,
-                attribute_name=attribute,
-                user_agent=(None if randomize_user_agent else user_agent),
-                max_items=max_items,
-                fast_mode=fast_mode,
-                is_canceled=nobody_canceled_yet,
-                detail_url_selector=detail_url_selector,
-                detail_url_attribute=detail_url_attribute,
-                detail_image_selector=detail_image_selector,
-                detail_image_attribute=detail_image_attribute,
-            )
+            try:
+                _, items = peek_first(iter_and_cache(scrape_params))
+            except ValueError as exc:
+                # Bad selector or selector_type, reported before any bytes go out
+                flash(f"Export failed: {exc}", "error")
+                return redirect(url_for("index"))
 
+        # Stream the file out row by row instead of building it in memory first
         if export_format == "json":
-            json_goodies = json.dumps([item for item in result.items], ensure_ascii=False, indent=2)
-            buffer = io.BytesIO(json_goodies.encode("utf-8"))
-            buffer.seek(0)
-            return send_file(
-                buffer,
-                mimetype="application/json; charset=utf-8",
-                as_attachment=True,
-                download_name="scrape.json",
-            )
-
-        # Default to CSV
-        text_buffer = io.StringIO()
-        csv_wizard = csv.DictWriter(
-            text_buffer,
-            fieldnames=["index", "tag", "text", "href", "attribute_value", "image_url", "html"],
-            extrasaction="ignore",
+            body, mimetype, download_name = iter_json_array(items, fieldnames=columns), "application/json; charset=utf-8", "scrape.json"
+        else:
+            # Default to CSV
+            body, mimetype, download_name = iter_csv(items, columns), "text/csv; charset=utf-8", "scrape.csv"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={download_name}"},
         )
-        csv_wizard.writeheader()
-        for item in result.items:
-            csv_wizard.writerow(item)
-        data = text_buffer.getvalue().encode("utf-8")
-        buffer = io.BytesIO(data)
-        buffer.seek(0)
-        return send_file(
-            buffer,
-            mimetype="text/csv; charset=utf-8",
-            as_attachment=True,
-            download_name="scrape.csv",
+
+    # Same selector config over many URLs, results streamed back as they finish
+    @app.route("/batch", methods=["POST"])
+    def batch():
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            raw_urls = data.get("urls") or []
+            if isinstance(raw_urls, str):
+                raw_urls = raw_urls.splitlines()
+            source = {k: "" if v is None else str(v) for k, v in data.items() if k != "urls"}
+        else:
+            raw_urls = request.form.get("urls", "").splitlines()
+            upload = request.files.get("url_file")
+            if upload is not None:
+                raw_urls += upload.read().decode("utf-8", errors="replace").splitlines()
+            source = request.values
+        params = parse_scrape_args(source)
+        urls = [u.strip() for u in raw_urls if isinstance(u, str) and u.strip() and not u.strip().startswith("#")]
+
+        if not urls or not params["selector"]:
+            return {"ok": False, "error": "urls and selector are required."}, 400
+        if len(urls) > app.config["BATCH_MAX_URLS"]:
+            return {"ok": False, "error": f"At most {app.config['BATCH_MAX_URLS']} URLs per batch."}, 400
+        try:
+            fields = parse_fields(params["fields"])
+        except ValueError as exc:
+            return {"ok": False, "error": str(exc)}, 400
+
+        pages = iter_batch(
+            urls,
+            selector_type=params["selector_type"],
+            selector=params["selector"],
+            attribute_name=params["attribute"],
+            user_agent=(None if params["randomize_user_agent"] else params["user_agent"]),
+            max_items=params["max_items"],
+            fast_mode=params["fast_mode"],
+            detail_url_selector=params["detail_url_selector"],
+            detail_url_attribute=params["detail_url_attribute"],
+            detail_image_selector=params["detail_image_selector"],
+            detail_image_attribute=params["detail_image_attribute"],
+            lean_parse=params["lean_parse"],
+            respect_robots=params["respect_robots"],
+            rate_limit=params["rate_limit"],
+            fields=fields,
+            max_workers=app.config["BATCH_WORKERS"],
         )
+        try:
+            # Bad selector_type surfaces here, before any bytes go out
+            first = next(pages, None)
+        except ValueError as exc:
+            return {"ok": False, "error": str(exc)}, 400
+
+        def rows() -> Iterator[Dict[str, Any]]:
+            # Every row says which URL it came from; a failed URL is one row with its error
+            for page in itertools.chain([first] if first is not None else [], pages):
+                if page.error is not None:
+                    yield {"source_url": page.url, "error": page.error}
+                    continue
+                for item in page.items:
+                    row: Dict[str, Any] = {"source_url": page.url}
+                    row.update((name, item.get(name)) for name in (fields or ScrapeItem.FIELDS))
+                    yield row
+
+        export_format = (source.get("format") or "ndjson").strip().lower()
+        if export_format == "csv":
+            columns = ["source_url", *(fields or CSV_FIELDS), "error"]
+            body, mimetype = iter_csv(rows(), columns), "text/csv; charset=utf-8"
+        elif export_format == "json":
+            body, mimetype = iter_json_array(rows()), "application/json; charset=utf-8"
+        else:
+            body, mimetype = iter_ndjson(rows()), "application/x-ndjson; charset=utf-8"
+        return Response(stream_with_context(body), mimetype=mimetype)
 
     @app.route("/download-image", methods=["GET"])
     def download_image():
@@ -337,16 +696,22 @@ def create_app() -> Flask:
             flash("Missing image URL", "error")
             return redirect(url_for("index"))
 
+        parsed = urlparse(image_url)
+        filename = os.path.basename(parsed.path) or "image"
+        store = get_image_store()
         try:
-            headers = {"User-Agent": request.args.get("user_agent", "scraper-webUI")}
-            resp = requests.get(image_url, headers=headers, timeout=30)
+            session = create_session(request.args.get("user_agent", "").strip() or "scraper-webUI")
+            if store is not None:
+                # Served from disk; only the first download of this URL touches the network.
+                # The open handle keeps the blob readable even if a ZIP build evicts it meanwhile
+                stored, fh = store.open(session, image_url, timeout=30)
+                return send_file(fh, mimetype=stored.content_type, as_attachment=True, download_name=filename)
+            resp = session.get(image_url, timeout=30)
             resp.raise_for_status()
         except Exception as exc:
             flash(f"Failed to fetch image: {exc}", "error")
             return redirect(url_for("index"))
 
-        parsed = urlparse(image_url)
-        filename = os.path.basename(parsed.path) or "image"
         content_type = resp.headers.get("Content-Type", "application/octet-stream")
 
         return send_file(
@@ -358,126 +723,44 @@ def create_app() -> Flask:
 
     @app.route("/download-all-images", methods=["GET"])
     def download_all_images():
-        target_url = request.args.get("url", "").strip()
-        selector_type = request.args.get("selector_type", "css").strip().lower()
-        selector = request.args.get("selector", "").strip()
-        attribute = request.args.get("attribute", "").strip() or None
-        user_agent = request.args.get("user_agent", "").strip() or None
-        max_items_raw = request.args.get("max_items", "").strip()
-        next_selector = request.args.get("next_selector", "").strip() or None
-        max_pages_raw = request.args.get("max_pages", "").strip()
-        detail_url_selector = request.args.get("detail_url_selector", "").strip() or None
-        detail_url_attribute = request.args.get("detail_url_attribute", "").strip() or "href"
-        detail_image_selector = request.args.get("detail_image_selector", "").strip() or None
-        detail_image_attribute = request.args.get("detail_image_attribute", "").strip() or "src"
-        fast_mode = (request.args.get("fast_mode", "").strip().lower() in {"1", "true", "on", "yes"})
-        randomize_user_agent = (request.args.get("randomize_user_agent", "").strip().lower() in {"1", "true", "on", "yes"})
-        respect_raw = request.args.get("respect_robots", "1").strip().lower()
-        respect_robots = respect_raw in {"1", "true", "yes", "on"}
+        params = parse_scrape_args(request.args)
+        user_agent = params["user_agent"]
 
-        try:
-            max_items: Optional[int] = int(max_items_raw) if max_items_raw else None
-        except ValueError:
-            max_items = None
-        try:
-            max_pages: Optional[int] = int(max_pages_raw) if max_pages_raw else None
-        except ValueError:
-            max_pages = None
-
-        if not target_url or not selector:
+        if not params["url"] or not params["selector"]:
             flash("URL and selector are required.", "error")
             return redirect(url_for("index"))
 
-        if respect_robots and not is_allowed_by_robots(target_url, user_agent or "scraper-webUI"):
+        if params["respect_robots"] and not is_allowed_by_robots(params["url"], user_agent or "scraper-webUI"):
             flash("Download blocked by robots.txt.", "error")
             return redirect(url_for("index"))
+        # The ZIP only needs image URLs, skip every other extractor
+        scrape_params = dict(params, fields="image_url")
+        cached = lookup_cached(params) or result_cache.get(make_result_key(scrape_params))
 
-        def still_not_canceled() -> bool:
-            return False
-
-        if next_selector or max_pages:
-            result = scrape_paginated(
-                url=target_url,
-                selector_type=selector_type,
-                selector=selector,
-                next_selector=next_selector,
-                attribute_name=attribute,
-                user_agent=(None if randomize_user_agent else user_agent),
-                max_items=max_items,
-                max_pages=max_pages,
-                fast_mode=fast_mode,
-                is_canceled=still_not_canceled,
-                detail_url_selector=detail_url_selector,
-                detail_url_attribute=detail_url_attribute,
-                detail_image_selector=detail_image_selector,
-                detail_image_attribute=detail_image_attribute,
-            )
+        if cached is not None:
+            source: Iterator[ScrapeItem] = iter(cached.result.items)
         else:
-            result = scrape_with_selector(
-                url=target_url,
-                selector_type=selector_type,
-                selector=selector,
-                attribute_name=attribute,
-                user_agent=(None if randomize_user_agent else user_agent),
-                max_items=max_items,
-                fast_mode=fast_mode,
-                is_canceled=still_not_canceled,
-                detail_url_selector=detail_url_selector,
-                detail_url_attribute=detail_url_attribute,
-                detail_image_selector=detail_image_selector,
-                detail_image_attribute=detail_image_attribute,
-            )
-
-        treasure_trove = [it for it in result.items if it.get("image_url")]
-        if not treasure_trove:
+            source = iter_and_cache(scrape_params)
+        try:
+            first, treasure_trove = peek_first(it for it in source if it.get("image_url"))
+        except ValueError as exc:
+            flash(f"Download failed: {exc}", "error")
+            return redirect(url_for("index"))
+        if first is None:
             flash("No images detected to download.", "error")
             return redirect(url_for("results", **request.args))
 
-        def sanitize(name: str) -> str:
-            return re.sub(r"[^A-Za-z0-9._-]", "_", name)[:120]
-
-        # Use a session for connection pooling across image downloads
-        img_session = requests.Session()
-        img_session.headers.update({"User-Agent": user_agent or "scraper-webUI"})
-        zip_buffer = io.BytesIO()
-
-        def fetch(idx_and_url):
-            idx, img_url = idx_and_url
-            try:
-                resp = img_session.get(img_url, timeout=20)
-                resp.raise_for_status()
-                return idx, img_url, resp
-            except Exception:
-                return idx, img_url, None
-
-        # Use ZIP_DEFLATED with compression level for better performance
-        with zipfile.ZipFile(zip_buffer, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
-                for idx, img_url, resp in ex.map(fetch, [(i, it["image_url"]) for i, it in enumerate(treasure_trove)]):
-                    if resp is None:
-                        continue
-                    parsed = urlparse(img_url)
-                    base = os.path.basename(parsed.path) or f"image_{idx}"
-                    root, ext = os.path.splitext(base)
-                    if not ext:
-                        ct = resp.headers.get("Content-Type", "")
-                        if "png" in ct:
-                            ext = ".png"
-                        elif "webp" in ct:
-                            ext = ".webp"
-                        elif "gif" in ct:
-                            ext = ".gif"
-                        else:
-                            ext = ".jpg"
-                    filename = f"{idx:04d}_{sanitize(root)}{ext}"
-                    zf.writestr(filename, resp.content)
-
-        zip_buffer.seek(0)
-        return send_file(
-            zip_buffer,
+        # Shared pools, so image hosts seen during the scrape reuse their connections
+        img_session = create_session(
+            user_agent or "scraper-webUI",
+            fast_mode=params["fast_mode"],
+            rate_limit=params["rate_limit"],
+            respect_robots=params["respect_robots"],
+        )
+        return Response(
+            stream_with_context(iter_image_zip(img_session, (it["image_url"] for it in treasure_trove), max_workers=8, store=get_image_store())),
             mimetype="application/zip",
-            as_attachment=True,
-            download_name="images.zip",
+            headers={"Content-Disposition": "attachment; filename=images.zip"},
         )
 
     return app
@@ -0,0 +1,157 @@
+# scraper-webUI
+# Local HTTP fixture server for the benchmarks
+# fixture_server.py
+# By G0246
+
+# Serves a synthetic shop: numbered listing pages chained by next links, one
+# detail page per item with its full image buried in filler markup, and
+# images of a fixed size. Every response waits ``latency_ms`` first, so the
+# numbers reflect a site that is slow the way real ones are, not loopback.
+#
+#   /list/<n>          listing page n (items, thumbnails, detail links, next link)
+#   /detail/<n>-<i>    detail page, <img id="full"> sits after ``detail_kb`` / 2 of filler
+#   /img/<name>.jpg    ``image_kb`` of bytes, distinct per name
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+@dataclass
+class FixtureConfig:
+    pages: int = 10
+    items_per_page: int = 20
+    latency_ms: float = 20.0
+    image_kb: int = 64
+    detail_kb: int = 48
+
+def _filler(size: int) -> str:
+    block = '<div class="spec"><span>Weight</span><span>1.2 kg</span><p>Lorem ipsum dolor sit amet.</p></div>\n'
+    return block * max(0, size // len(block))
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_FixtureHTTPServer"
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this every response
+    # waits out the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients hang up mid-body on purpose (streamed detail pages)
+        pass
+
+    def do_GET(self) -> None:
+        fixture = self.server.fixture
+        config = fixture.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000.0)
+        path = self.path.split("?", 1)[0]
+        kind, _, name = path.strip("/").partition("/")
+        fixture.count(kind)
+
+        if kind == "list" and name.isdigit() and 1 <= int(name) <= config.pages:
+            self._send(200, "text/html; charset=utf-8", fixture.listing_page(int(name)))
+        elif kind == "detail" and name:
+            self._send(200, "text/html; charset=utf-8", fixture.detail_page(name))
+        elif kind == "img" and name:
+            self._send(200, "image/jpeg", fixture.image(name))
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self.server.fixture.count("bytes", len(body))
+
+class _FixtureHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    fixture: "FixtureServer"
+
+class FixtureServer:
+    """The fixture site on 127.0.0.1, served from a background thread.
+
+    Use it as a context manager; ``base_url`` is set once it is listening.
+    """
+
+    def __init__(self, config: Optional[FixtureConfig] = None, port: int = 0) -> None:
+        self.config = config or FixtureConfig()
+        self._port = port
+        self._counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        self._httpd: Optional[_FixtureHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._filler = _filler(self.config.detail_kb * 1024 // 2)
+        self.base_url = ""
+
+    def __enter__(self) -> "FixtureServer":
+        self._httpd = _FixtureHTTPServer(("127.0.0.1", self._port), _Handler)
+        self._httpd.fixture = self
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def count(self, kind: str, amount: int = 1) -> None:
+        with self._counts_lock:
+            self._counts[kind] += amount
+
+    def take_counts(self) -> Dict[str, int]:
+        """Requests per kind (and bytes sent) since the last call."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+            self._counts.clear()
+        return counts
+
+    def listing_url(self, page: int = 1) -> str:
+        return f"{self.base_url}/list/{page}"
+
+    def listing_page(self, page: int) -> bytes:
+        items = []
+        for i in range(self.config.items_per_page):
+            key = f"{page}-{i}"
+            items.append(
+                f'<div class="item"><a class="detail" href="/detail/{key}">'
+                f'<img class="thumb" src="/img/thumb-{key}.jpg" alt="Item {key}"></a>'
+                f'<h3 class="title">Item {key}</h3><span class="price">{(page * 31 + i * 7) % 100}.99</span></div>'
+            )
+        next_link = f'<li class="next"><a href="/list/{page + 1}">next</a></li>' if page < self.config.pages else ""
+        html = (
+            "<!doctype html><html><head><title>Listing</title></head><body>"
+            '<nav class="menu"><a href="/">Home</a></nav>'
+            f'<section class="items">{"".join(items)}</section>'
+            f'<ul class="pager">{next_link}</ul></body></html>'
+        )
+        return html.encode("utf-8")
+
+    def detail_page(self, key: str) -> bytes:
+        html = (
+            f"<!doctype html><html><head><title>Item {key}</title></head><body>"
+            f'<div class="specs">{self._filler}</div>'
+            f'<div class="gallery"><img id="full" src="/img/full-{key}.jpg" alt="Item {key}"></div>'
+            f'<div class="reviews">{self._filler}</div></body></html>'
+        )
+        return html.encode("utf-8")
+
+    def image(self, name: str) -> bytes:
+        # A name-specific header keeps the content store from collapsing them into one
+        head = f"\xff\xd8{name}".encode("latin-1", errors="replace")
+        return head + b"\0" * max(0, self.config.image_kb * 1024 - len(head))
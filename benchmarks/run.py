@@ -0,0 +1,306 @@
+# scraper-webUI
+# Offline benchmark runner
+# run.py
+# By G0246
+
+# Times the scrape entry points end to end against the local fixture server
+# and writes the numbers to a JSON file that later runs can be compared to:
+#
+#   python -m benchmarks.run                         # all scenarios -> .cache/bench/latest.json
+#   python -m benchmarks.run --output new.json --compare .cache/bench/baseline.json
+#
+# Each scenario runs in its own interpreter so its peak RSS is its own, and
+# with the HTTP cache, detail index and image store off (they would turn
+# every repeat into a disk read). --warm-caches leaves them on, pointed at a
+# scratch directory.
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCENARIOS = ("scrape_with_selector", "scrape_paginated", "enrich_detail_images", "export", "download_all_images")
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None  # Not available on Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    seconds = [run["seconds"] for run in runs]
+    items = runs[0]["items"] if runs else 0
+    p50 = percentile(seconds, 50)
+    summary: Dict[str, Any] = {
+        "runs": len(runs),
+        "items": items,
+        "p50_ms": round(p50 * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2) if seconds else 0.0,
+        "min_ms": round(min(seconds) * 1000, 2) if seconds else 0.0,
+        "items_per_sec": round(items / p50, 1) if p50 else 0.0,
+        "requests": runs[0]["requests"] if runs else {},
+    }
+    stage_names = sorted({name for run in runs for name in run.get("stages", {})})
+    if stage_names:
+        summary["stages_p50_ms"] = {
+            name: round(percentile([run["stages"][name] for run in runs if name in run["stages"]], 50) * 1000, 2)
+            for name in stage_names
+        }
+    return summary
+
+class _StageClock:
+    """progress_cb that turns scrape progress events into stage durations."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        # Last event of each stage marks where that stage ended
+        self.marks[event.get("stage", "")] = time.perf_counter()
+
+    def stages(self, end: float) -> Dict[str, float]:
+        listing_end = self.marks.get("page", self.start)
+        detail_end = self.marks.get("detail", listing_end)
+        return {"listing": listing_end - self.start, "detail": max(0.0, detail_end - listing_end), "total": end - self.start}
+
+def _scenario(name: str, server: Any, args: argparse.Namespace) -> Callable[[], Tuple[int, Dict[str, float]]]:
+    """The callable for one timed run: returns (items produced, stage seconds)."""
+    from scraper import core
+
+    listing = dict(url=server.listing_url(1), selector_type="css", selector=".item", fast_mode=True)
+    detail = dict(detail_url_selector="a.detail", detail_image_selector="#full")
+    paginated = dict(next_selector="li.next a", max_pages=args.pages)
+
+    if name == "scrape_with_selector":
+        def run() -> Tuple[int, Dict[str, float]]:
+            result = core.scrape_with_selector(**listing, detail_url_selector="a.detail")
+            return len(result.items), {}
+        return run
+
+    if name == "scrape_paginated":
+        def run() -> Tuple[int, Dict[str, float]]:
+            clock = _StageClock()
+            result = core.scrape_paginated(**listing, **paginated, **detail, progress_cb=clock)
+            return len(result.items), clock.stages(time.perf_counter())
+        return run
+
+    if name == "enrich_detail_images":
+        session = core.create_session(None, fast_mode=True)
+        base = core.scrape_paginated(**listing, **paginated, detail_url_selector="a.detail").items
+        server.take_counts()
+
+        def run() -> Tuple[int, Dict[str, float]]:
+            items = [core.ScrapeItem(**item.to_dict()) for item in base]
+            core._enrich_items_with_detail_images(session, items, "#full", "src", max_workers=8)
+            return len(items), {}
+        return run
+
+    if name in ("export", "download_all_images"):
+        from app import create_app
+
+        flask_app = create_app()
+        client = flask_app.test_client()
+        result_cache = flask_app.extensions["result_cache"]
+        query = dict(
+            url=listing["url"], selector=".item", fast_mode="1", respect_robots="0",
+            next_selector="li.next a", max_pages=str(args.pages), **detail,
+        )
+        path = "/download-all-images"
+        if name == "export":
+            path = "/export"
+            query["format"] = "csv"
+
+        def run() -> Tuple[int, Dict[str, float]]:
+            if not args.warm_caches:
+                # A finished download is kept in the result cache, which would turn later repeats into replays
+                result_cache.clear()
+            start = time.perf_counter()
+            response = client.get(path, query_string=query, buffered=False)
+            chunks = iter(response.response)
+            size = len(next(chunks, b""))
+            first_byte = time.perf_counter()
+            for chunk in chunks:
+                size += len(chunk)
+            response.close()
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+            return size, {"first_byte": first_byte - start, "total": time.perf_counter() - start}
+        return run
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.fixture_server import FixtureConfig, FixtureServer
+
+    config = FixtureConfig(
+        pages=args.pages,
+        items_per_page=args.items_per_page,
+        latency_ms=args.latency_ms,
+        image_kb=args.image_kb,
+        detail_kb=args.detail_kb,
+    )
+    with FixtureServer(config) as server:
+        run = _scenario(name, server, args)
+        for _ in range(args.warmup):
+            run()
+        server.take_counts()
+        runs = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            items, stages = run()
+            seconds = time.perf_counter() - start
+            runs.append({"seconds": seconds, "items": items, "stages": stages, "requests": server.take_counts()})
+    summary = _summarize(runs)
+    if name in ("export", "download_all_images"):
+        # These produce a file, so "items" is its size
+        summary["bytes"] = summary.pop("items")
+        summary["mb_per_sec"] = round(summary["bytes"] / 1e6 / (summary["p50_ms"] / 1000), 2) if summary["p50_ms"] else 0.0
+        summary.pop("items_per_sec")
+    summary["peak_rss_kb"] = peak_rss_kb()
+    return summary
+
+def _child_env(args: argparse.Namespace, scratch: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    # The fixture is local, so no pacing unless asked for
+    env.setdefault("SCRAPER_HOST_RATE", "0")
+    if args.warm_caches:
+        env.setdefault("SCRAPER_HTTP_CACHE_DIR", os.path.join(scratch, "http"))
+        env.setdefault("SCRAPER_DETAIL_INDEX_PATH", os.path.join(scratch, "detail_index.sqlite3"))
+        env.setdefault("SCRAPER_IMAGE_STORE_DIR", os.path.join(scratch, "images"))
+    else:
+        env.setdefault("SCRAPER_HTTP_CACHE", "0")
+        env.setdefault("SCRAPER_DETAIL_INDEX", "0")
+        env.setdefault("SCRAPER_IMAGE_STORE", "0")
+    env.setdefault("SCRAPER_CHECKPOINT_DIR", os.path.join(scratch, "checkpoints"))
+    return env
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print p50 changes per scenario and return the ones slower than ``threshold``."""
+    regressions = []
+    print(f"{'scenario':<24}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or "p50_ms" not in before or "p50_ms" not in now:
+            print(f"{name:<24}{'-':>14}{now.get('p50_ms', '-'):>14}{'new':>10}")
+            continue
+        change = (now["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24}{before['p50_ms']:>14}{now['p50_ms']:>14}{change:>+10.1%}{flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark scraper-webUI against a local fixture site.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before the timed ones")
+    parser.add_argument("--pages", type=int, default=10, help="listing pages in the fixture site")
+    parser.add_argument("--items-per-page", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay before every fixture response")
+    parser.add_argument("--image-kb", type=int, default=64)
+    parser.add_argument("--detail-kb", type=int, default=48)
+    parser.add_argument("--warm-caches", action="store_true", help="leave the HTTP cache, detail index and image store on")
+    parser.add_argument("--output", default=os.path.join(".cache", "bench", "latest.json"))
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare p50s against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="p50 slowdown that counts as a regression (0.15 = 15%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Worker process: one scenario, result on stdout
+        json.dump(run_scenario(args.child, args), sys.stdout)
+        return 0
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    forwarded = [
+        "--repeat", str(args.repeat), "--warmup", str(args.warmup), "--pages", str(args.pages),
+        "--items-per-page", str(args.items_per_page), "--latency-ms", str(args.latency_ms),
+        "--image-kb", str(args.image_kb), "--detail-kb", str(args.detail_kb),
+    ]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="scraper-bench-") as scratch:
+        env = _child_env(args, scratch)
+        for name in names:
+            print(f"running {name} ...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--child", name, *forwarded],
+                cwd=root, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                sys.stderr.write(proc.stderr)
+                results[name] = {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+                continue
+            results[name] = json.loads(proc.stdout)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "repeat": args.repeat, "warmup": args.warmup, "pages": args.pages, "items_per_page": args.items_per_page,
+            "latency_ms": args.latency_ms, "image_kb": args.image_kb, "detail_kb": args.detail_kb,
+            "warm_caches": args.warm_caches,
+        },
+        "scenarios": results,
+    }
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    for name, summary in results.items():
+        if "error" in summary:
+            print(f"{name:<24}FAILED: {summary['error']}")
+        else:
+            print(f"{name:<24}p50 {summary['p50_ms']:>9} ms   p99 {summary['p99_ms']:>9} ms   peak RSS {summary['peak_rss_kb']} KiB")
+
+    failed = any("error" in summary for summary in results.values())
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("config") != report["config"]:
+            print("note: baseline was recorded with a different config", file=sys.stderr)
+        if compare(baseline, report, args.threshold):
+            return 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+# scraper-webUI
+# Asyncio scraping engine
+# async_core.py
+# By G0246
+
+# Same inputs and ScrapeResult as scraper.core, but every fetch shares one
+# event loop. Detail pages and template pages are multiplexed over a single
+# aiohttp connector with a semaphore per host, instead of 8 worker threads.
+# Parsing still uses the helpers from scraper.core, run in worker threads so
+# they do not stall the loop.
+#
+# Timings are kept the same way: the _Fetcher of a scrape carries its
+# ScrapeTimings, so the async engine reports the same stages and counters and
+# feeds the same /metrics series. aiohttp has no HTTP cache here, so every
+# request counts as a network request.
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+import bs4
+from bs4 import SoupStrainer
+
+from scraper.core import (
+    DETAIL_CHUNK_BYTES,
+    DETAIL_DRAIN_BYTES,
+    ScrapeCancelled,
+    ScrapeItem,
+    ScrapeResult,
+    _build_headers,
+    _check_selector_type,
+    _crawl_delay_lookup,
+    _elements_to_items,
+    _find_next_url,
+    _image_url_from_detail_html,
+    _listing_strainer,
+    _parse_listing,
+    _robots_guard,
+    _select_page_elements,
+    _StreamingImageFinder,
+    parse_fields,
+)
+from scraper.detail_index import get_detail_index
+from scraper.metrics import ScrapeTimings, observe_request, record_scrape
+from scraper.politeness import get_scheduler
+
+DEFAULT_MAX_CONCURRENCY = 200  # Open connections across all hosts
+DEFAULT_MAX_PER_HOST = 16      # In-flight requests against one host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class _HostLimiter:
+    """Hands out one bounded semaphore per host, created on first use."""
+
+    def __init__(self, per_host: int) -> None:
+        self.per_host = max(1, per_host)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = (urlparse(url).netloc or "").lower()
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.BoundedSemaphore(self.per_host)
+            self._semaphores[host] = semaphore
+        return semaphore
+
+# Failures worth another try, like the read timeouts and broken bodies urllib3 retries
+RETRIED_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+class _Fetcher:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        per_host: int,
+        fast_mode: bool,
+        retries: int = 2,
+        rate_limit: Optional[float] = None,
+        crawl_delay_for: Optional[Callable[[str], Optional[float]]] = None,
+        timings: Optional[ScrapeTimings] = None,
+    ) -> None:
+        self.session = session
+        self.limiter = _HostLimiter(per_host)
+        self.retries = 0 if fast_mode else max(0, retries)
+        self.backoff = 0.15 if fast_mode else 0.3
+        self.rate_limit = rate_limit
+        self.crawl_delay_for = crawl_delay_for
+        self.timings = timings if timings is not None else ScrapeTimings()
+
+    async def _wait_for_turn(self, url: str) -> None:
+        # Same per-host token buckets as the threaded engine
+        crawl_delay = await asyncio.to_thread(self.crawl_delay_for, url) if self.crawl_delay_for else None
+        wait = get_scheduler().reserve(url, rate_cap=self.rate_limit, crawl_delay=crawl_delay)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def fetch(self, url: str, consume: Callable[[aiohttp.ClientResponse], Awaitable[Any]], allow_missing: bool = False) -> Any:
+        """GET a page and return ``consume(response)``, retrying like the urllib3 Retry used by the sync engine.
+
+        With ``allow_missing`` a 404/410 returns None instead of raising.
+        """
+        for attempt in range(self.retries + 1):
+            last_try = attempt == self.retries
+            try:
+                async with self.limiter(url):
+                    await self._wait_for_turn(url)
+                    start = time.perf_counter()
+                    async with self.session.get(url) as resp:
+                        headers_at = time.perf_counter()
+                        get_scheduler().observe(url, resp.status, resp.headers.get("Retry-After"))
+                        # A 429/503 also pauses the host bucket for its Retry-After
+                        if resp.status in RETRY_STATUSES and not last_try:
+                            pass
+                        elif allow_missing and resp.status in (404, 410):
+                            self._count(resp, start, headers_at, attempt)
+                            return None
+                        else:
+                            resp.raise_for_status()
+                            result = await consume(resp)
+                            self._count(resp, start, headers_at, attempt)
+                            return result
+            except RETRIED_ERRORS:
+                if last_try:
+                    raise
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+        return None
+
+    def _count(self, resp: aiohttp.ClientResponse, start: float, headers_at: float, retries: int) -> None:
+        # Waiting for the headers is "fetch", reading what consume() wanted of the body is "download"
+        fetch = headers_at - start
+        observe_request(fetch, retries, False)
+        self.timings.count_response(fetch, time.perf_counter() - headers_at, resp.content.total_bytes, retries, False)
+
+    async def text(self, url: str, allow_missing: bool = False) -> Optional[str]:
+        return await self.fetch(url, lambda resp: resp.text(errors="replace"), allow_missing)
+
+async def _scan_detail_page(resp: aiohttp.ClientResponse, finder: _StreamingImageFinder) -> Optional[str]:
+    # Feeding a chunk is cheap enough to do on the loop; the full-page parse is what goes to a thread
+    chunks = resp.content.iter_chunked(DETAIL_CHUNK_BYTES)
+    async for chunk in chunks:
+        if finder.feed(chunk):
+            break
+    else:
+        finder.close()
+        return finder.result()
+    # Same as the sync engine: a short remainder is read so the connection is kept
+    drained = 0
+    async for chunk in chunks:
+        drained += len(chunk)
+        if drained > DETAIL_DRAIN_BYTES:
+            break
+    return finder.result()
+
+@asynccontextmanager
+async def _session_scope(
+    session: Optional[aiohttp.ClientSession],
+    user_agent: Optional[str],
+    max_concurrency: int,
+) -> AsyncIterator[aiohttp.ClientSession]:
+    if session is not None:
+        yield session
+        return
+    connector = aiohttp.TCPConnector(limit=max(1, max_concurrency))
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers=_build_headers(user_agent),
+        timeout=aiohttp.ClientTimeout(total=15),
+    ) as owned:
+        yield owned
+
+def _check_canceled(is_canceled: Optional[Callable[[], bool]]) -> None:
+    if is_canceled and is_canceled():
+        raise ScrapeCancelled("Cancelled")
+
+def _parse_page(
+    html: str,
+    selector_type: str,
+    selector: str,
+    page_url: str,
+    next_selector: Optional[str],
+    strainer: Optional[SoupStrainer],
+    timings: ScrapeTimings,
+) -> Tuple[List[bs4.Tag], Optional[str]]:
+    with timings.measure("parse"):
+        soup = _parse_listing(html, selector_type, strainer)
+    with timings.measure("select"):
+        elements = _select_page_elements(soup, selector_type, selector)
+    timings.count_page()
+    return elements, _find_next_url(page_url, soup, next_selector)
+
+async def _enrich_items_with_detail_images(
+    fetcher: _Fetcher,
+    items: List[ScrapeItem],
+    detail_image_selector: str,
+    detail_image_attribute: str,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    selector_type: str = "css",
+    allowed: Optional[Callable[[str], bool]] = None,
+) -> None:
+    url_to_indices: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        detail_url = item.get("detail_url")
+        if detail_url:
+            url_to_indices.setdefault(detail_url, []).append(i)
+    if allowed is not None and url_to_indices:
+        # robots.txt lookups may hit the network, keep them off the loop
+        blocked = await asyncio.to_thread(lambda: [u for u in url_to_indices if not allowed(u)])
+        for detail_url in blocked:
+            del url_to_indices[detail_url]
+    if not url_to_indices:
+        return
+
+    # Pages resolved by an earlier scrape are not fetched again
+    index = get_detail_index()
+    if index is not None:
+        known = await asyncio.to_thread(
+            index.lookup_many, list(url_to_indices), detail_image_selector, detail_image_attribute, selector_type
+        )
+        for detail_url, full_img in known.items():
+            for idx in url_to_indices.pop(detail_url):
+                items[idx]["image_url"] = full_img
+        if not url_to_indices:
+            return
+    resolved: List[Tuple[str, str]] = []
+
+    async def fetch_detail_image(detail_url: str) -> Tuple[str, Optional[str]]:
+        if is_canceled and is_canceled():
+            return detail_url, None
+        try:
+            async def consume(resp: aiohttp.ClientResponse) -> Tuple[bool, Optional[str]]:
+                # Simple CSS selectors stop reading at the image element, anything else needs the whole page
+                finder = _StreamingImageFinder.for_selector(
+                    detail_image_selector, selector_type, detail_url, detail_image_attribute, resp.charset
+                )
+                if finder is not None:
+                    return True, await _scan_detail_page(resp, finder)
+                return False, await resp.text(errors="replace")
+
+            fetched = await fetcher.fetch(detail_url, consume)
+            if fetched is None:
+                return detail_url, None
+            streamed, value = fetched
+            if streamed or value is None:
+                return detail_url, value
+            full_img = await asyncio.to_thread(
+                _image_url_from_detail_html, value, detail_url, detail_image_selector, detail_image_attribute, selector_type
+            )
+            return detail_url, full_img
+        except Exception:
+            return detail_url, None
+
+    # Every detail page is scheduled at once, the per-host semaphores do the pacing
+    tasks = [asyncio.ensure_future(fetch_detail_image(u)) for u in url_to_indices]
+    try:
+        for done, next_finished in enumerate(asyncio.as_completed(tasks), start=1):
+            detail_url, full_img = await next_finished
+            _check_canceled(is_canceled)
+            if progress_cb and (done % 10 == 0 or done == len(tasks)):
+                progress_cb({"stage": "detail", "items": done, "total": len(tasks)})
+            if full_img:
+                resolved.append((detail_url, full_img))
+                for idx in url_to_indices[detail_url]:
+                    items[idx]["image_url"] = full_img
+    finally:
+        for task in tasks:
+            task.cancel()
+    if index is not None:
+        await asyncio.to_thread(index.store_many, resolved, detail_image_selector, detail_image_attribute, selector_type)
+
+async def scrape_with_selector(
+    url: str,
+    selector_type: str,
+    selector: str,
+    attribute_name: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    max_items: Optional[int] = None,
+    detail_url_selector: Optional[str] = None,
+    detail_url_attribute: str = "href",
+    detail_image_selector: Optional[str] = None,
+    detail_image_attribute: str = "src",
+    fast_mode: bool = False,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    session: Optional[aiohttp.ClientSession] = None,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
+) -> ScrapeResult:
+    start_time = time.perf_counter()
+    _check_canceled(is_canceled)
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    strainer = _listing_strainer(lean_parse, selector_type, selector, None, detail_url_selector, detail_image_selector)
+    allowed = _robots_guard(respect_robots, user_agent)
+    timings = ScrapeTimings()
+    async with _session_scope(session, user_agent, max_concurrency) as http:
+        fetcher = _Fetcher(
+            http, max_per_host, fast_mode,
+            rate_limit=rate_limit, crawl_delay_for=_crawl_delay_lookup(respect_robots, user_agent), timings=timings,
+        )
+        html = await fetcher.text(url)
+        elements, _ = await asyncio.to_thread(_parse_page, html or "", selector_type, selector, url, None, strainer, timings)
+        if max_items is not None and max_items >= 0:
+            elements = elements[: max(0, max_items)]
+        with timings.measure("items"):
+            items = await asyncio.to_thread(
+                _elements_to_items, url, elements, attribute_name,
+                detail_url_selector, detail_url_attribute, detail_image_selector, detail_image_attribute, fields,
+            )
+        if detail_image_selector:
+            with timings.measure("detail"):
+                await _enrich_items_with_detail_images(
+                    fetcher, items, detail_image_selector, detail_image_attribute,
+                    is_canceled=is_canceled, progress_cb=progress_cb, selector_type=selector_type,
+                    allowed=allowed,
+                )
+
+    if progress_cb:
+        progress_cb({"stage": "done", "items": len(items), "url": url})
+
+    elapsed = time.perf_counter() - start_time
+    record_scrape("single", timings, elapsed)
+    return ScrapeResult(
+        url=url,
+        selector=selector,
+        selector_type=selector_type,
+        items=items,
+        elapsed_ms=int(elapsed * 1000),
+        timings=timings.to_dict(),
+    )
+
+async def scrape_paginated(
+    url: str,
+    selector_type: str,
+    selector: str,
+    next_selector: Optional[str] = None,
+    attribute_name: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    detail_url_selector: Optional[str] = None,
+    detail_url_attribute: str = "href",
+    detail_image_selector: Optional[str] = None,
+    detail_image_attribute: str = "src",
+    fast_mode: bool = False,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    page_url_template: Optional[str] = None,
+    page_start: int = 1,
+    page_window: int = 4,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    session: Optional[aiohttp.ClientSession] = None,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
+) -> ScrapeResult:
+    start_time = time.perf_counter()
+    if page_url_template and "{n}" not in page_url_template:
+        raise ValueError("page_url_template must contain a {n} placeholder.")
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    strainer = _listing_strainer(lean_parse, selector_type, selector, next_selector, detail_url_selector, detail_image_selector)
+    allowed = _robots_guard(respect_robots, user_agent)
+    if allowed is not None:
+        # Warm the robots cache for the seed host so the checks below stay cheap
+        await asyncio.to_thread(allowed, page_url_template.replace("{n}", str(page_start)) if page_url_template else url)
+
+    timings = ScrapeTimings()
+    collected: List[ScrapeItem] = []
+    pages_visited = 0
+    url_graveyard: set = set()  # Track visited URLs to avoid infinite loops
+
+    async with _session_scope(session, user_agent, max_concurrency) as http:
+        fetcher = _Fetcher(
+            http, max_per_host, fast_mode,
+            rate_limit=rate_limit, crawl_delay_for=_crawl_delay_lookup(respect_robots, user_agent), timings=timings,
+        )
+        # Page fetches run ahead as tasks while the previous page is being parsed
+        ahead: List[Tuple[str, "asyncio.Future[Optional[str]]"]] = []
+        next_number = page_start
+        last_page = page_start + max(1, max_pages) - 1 if max_pages is not None else None
+
+        def schedule(page_url: str, fetch: Awaitable[Optional[str]]) -> None:
+            ahead.append((page_url, asyncio.ensure_future(fetch)))
+
+        def top_up_template() -> None:
+            nonlocal next_number, last_page
+            while len(ahead) < max(1, page_window) and (last_page is None or next_number <= last_page):
+                page_url = page_url_template.replace("{n}", str(next_number))  # type: ignore[union-attr]
+                if allowed is not None and not allowed(page_url):
+                    last_page = next_number - 1
+                    return
+                schedule(page_url, fetcher.text(page_url, allow_missing=True))
+                next_number += 1
+
+        if page_url_template:
+            top_up_template()
+        else:
+            schedule(url, fetcher.text(url))
+
+        try:
+            while ahead:
+                _check_canceled(is_canceled)
+                current_url, pending = ahead.pop(0)
+                if current_url in url_graveyard:
+                    break
+                url_graveyard.add(current_url)
+                html = await pending
+                if html is None:
+                    break
+
+                elements, next_url = await asyncio.to_thread(
+                    _parse_page, html, selector_type, selector, current_url,
+                    None if page_url_template else next_selector, strainer, timings,
+                )
+                if page_url_template and not elements:
+                    break
+
+                pages_visited += 1
+                room_for_more = (max_pages is None or pages_visited < max_pages) and (
+                    max_items is None or len(collected) + len(elements) < max_items
+                )
+                if room_for_more:
+                    if page_url_template:
+                        top_up_template()
+                    elif next_url and next_url != current_url and next_url not in url_graveyard:
+                        if allowed is None or await asyncio.to_thread(allowed, next_url):
+                            schedule(next_url, fetcher.text(next_url))
+
+                with timings.measure("items"):
+                    page_items = await asyncio.to_thread(
+                        _elements_to_items, current_url, elements, attribute_name,
+                        detail_url_selector, detail_url_attribute, detail_image_selector, detail_image_attribute, fields,
+                    )
+                collected.extend(page_items)
+
+                if progress_cb:
+                    progress_cb({
+                        "stage": "page",
+                        "pages_visited": pages_visited - 1,
+                        "items": len(collected),
+                        "url": current_url,
+                    })
+
+                if max_items is not None and len(collected) >= max_items:
+                    collected = collected[:max(0, max_items)]
+                    break
+                if not room_for_more:
+                    break
+        finally:
+            for _, pending in ahead:
+                pending.cancel()
+
+        if detail_image_selector:
+            with timings.measure("detail"):
+                await _enrich_items_with_detail_images(
+                    fetcher, collected, detail_image_selector, detail_image_attribute,
+                    is_canceled=is_canceled, progress_cb=progress_cb, selector_type=selector_type,
+                    allowed=allowed,
+                )
+
+    # Reindex items
+    for idx, item in enumerate(collected):
+        item["index"] = idx
+
+    if progress_cb:
+        progress_cb({"stage": "done", "items": len(collected), "url": url})
+
+    elapsed = time.perf_counter() - start_time
+    record_scrape("paginated", timings, elapsed)
+    return ScrapeResult(
+        url=url,
+        selector=selector,
+        selector_type=selector_type,
+        items=collected,
+        elapsed_ms=int(elapsed * 1000),
+        timings=timings.to_dict(),
+    )
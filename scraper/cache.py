@@ -0,0 +1,143 @@
+# scraper-webUI
+# Server-side scrape result cache
+# cache.py
+# By G0246
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from scraper.core import ScrapeResult
+
+# Query parameters that change what a scrape returns. Things like fast_mode only
+# change how we get there, so they are left out of the key. respect_robots stays
+# in: it decides which next pages and detail pages the scrape may visit.
+RESULT_KEY_FIELDS = [
+    "url",
+    "selector_type",
+    "selector",
+    "attribute",
+    "user_agent",
+    "randomize_user_agent",
+    "max_items",
+    "next_selector",
+    "max_pages",
+    "page_url_template",
+    "page_start",
+    "detail_url_selector",
+    "detail_url_attribute",
+    "detail_image_selector",
+    "detail_image_attribute",
+    "lean_parse",
+    "respect_robots",
+    "fields",
+]
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    # Scheme and host are case-insensitive, the fragment never reaches the server
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+def make_result_key(params: Dict[str, Any]) -> str:
+    normalized: Dict[str, Any] = {}
+    for name in RESULT_KEY_FIELDS:
+        value = params.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        normalized[name] = value if value not in ("", None) else None
+    normalized["url"] = _normalize_url(params.get("url") or "")
+    if normalized["selector_type"]:
+        normalized["selector_type"] = normalized["selector_type"].lower()
+    blob = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:20]
+
+@dataclass
+class CachedResult:
+    result: ScrapeResult
+    progress_events: List[dict] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+
+class ResultCache:
+    """In-memory store of finished scrapes, keyed by the normalized query.
+
+    Entries expire after ``ttl_seconds`` and the least recently used ones are
+    dropped once either ``max_entries`` or ``max_total_items`` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 32, max_total_items: int = 200_000, ttl_seconds: float = 900.0) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_total_items = max(1, max_total_items)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._total_items = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_expired(self, entry: CachedResult, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_items -= len(entry.result.items)
+
+    def get(self, result_id: Optional[str]) -> Optional[CachedResult]:
+        if not result_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._is_expired(entry, time.monotonic()):
+                self._drop(result_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(result_id)
+            self.hits += 1
+            return entry
+
+    def put(self, result_id: str, result: ScrapeResult, progress_events: Optional[List[dict]] = None) -> str:
+        entry = CachedResult(result=result, progress_events=list(progress_events or []))
+        with self._lock:
+            self._drop(result_id)
+            self._entries[result_id] = entry
+            self._total_items += len(result.items)
+            self._evict()
+        return result_id
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if self._is_expired(e, now)]:
+            self._drop(key)
+        # Always keep the newest entry, even if it alone is over the item budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_items > self.max_total_items
+        ):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_items = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "items": self._total_items,
+                "max_entries": self.max_entries,
+                "max_total_items": self.max_total_items,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
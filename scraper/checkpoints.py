@@ -0,0 +1,257 @@
+# scraper-webUI
+# Resumable crawl checkpoints
+# checkpoints.py
+# By G0246
+
+# A paginated crawl given a checkpoint id saves its position after every page:
+# the pages already visited, where to go next and the items so far. If the
+# crawl dies (worker killed, proxy timeout, a 5xx after the retries), the next
+# run with the same id starts from the saved position instead of page 1.
+#
+# Each checkpoint is a directory with an append-only items.jsonl and a small
+# state.json that is rewritten (write + rename) after the items of a page are
+# appended. state.json records how many bytes of items.jsonl belong to the
+# checkpoint, so items appended by a page that never finished are ignored.
+#
+# A crawl holds an exclusive lock on its checkpoint (a lockfile next to the
+# directory) from load to discard. A second run of the same crawl that finds
+# the lock taken goes ahead without a checkpoint rather than sharing one.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to O_EXCL lockfiles
+    fcntl = None  # type: ignore[assignment]
+
+CHECKPOINT_DIR = os.environ.get("SCRAPER_CHECKPOINT_DIR", os.path.join(".cache", "checkpoints"))
+# Checkpoints not touched for this long are dropped
+CHECKPOINT_TTL = float(os.environ.get("SCRAPER_CHECKPOINT_TTL", str(24 * 3600)))
+
+@dataclass
+class CrawlCursor:
+    """Where a crawl stands. The page iterators in scraper.core keep it up to date."""
+
+    visited: Set[str] = field(default_factory=set)
+    next_url: Optional[str] = None   # Next-link crawls
+    next_page: Optional[int] = None  # Template crawls
+    pages_visited: int = 0
+    elements_seen: int = 0
+    resumed: bool = False
+
+def crawl_fingerprint(**params: Any) -> str:
+    """Hash of the arguments that decide what a crawl collects."""
+    blob = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+class CrawlCheckpoint:
+    def __init__(self, directory: str, fingerprint: str) -> None:
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self._state_path = os.path.join(directory, "state.json")
+        self._items_path = os.path.join(directory, "items.jsonl")
+        self._items_bytes = 0
+        self._lock_path = directory + ".lock"
+        self._lock_fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Take the checkpoint for this crawl; False if another run holds it."""
+        if self._lock_fd is None:
+            self._lock_fd = _try_lock(self._lock_path)
+        return self._lock_fd is not None
+
+    def release(self) -> None:
+        if self._lock_fd is not None:
+            _unlock(self._lock_path, self._lock_fd)
+            self._lock_fd = None
+
+    def load(self) -> Optional[Tuple[CrawlCursor, List[Dict[str, Any]]]]:
+        """The saved cursor and items, or None if there is nothing usable to resume.
+
+        Call it with the checkpoint acquired.
+        """
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as fh:
+                state = json.load(fh)
+        except FileNotFoundError:
+            # Nothing saved yet, or a crash before the first page was recorded:
+            # items appended without a state belong to no page
+            self._drop_items()
+            return None
+        except (OSError, ValueError):
+            self.discard()
+            return None
+        if not isinstance(state, dict):
+            self.discard()
+            return None
+        if state.get("fingerprint") != self.fingerprint:
+            # Same id, different crawl
+            self.discard()
+            return None
+        items_bytes = int(state.get("items_bytes", 0))
+        items: List[Dict[str, Any]] = []
+        try:
+            with open(self._items_path, "r+b") as fh:
+                data = fh.read(items_bytes)
+                # Drop whatever a page that never got its state written appended
+                fh.truncate(items_bytes)
+        except FileNotFoundError:
+            data = b""
+        if len(data) != items_bytes:
+            self.discard()
+            return None
+        try:
+            for line in data.splitlines():
+                if line:
+                    items.append(json.loads(line))
+            self._items_bytes = items_bytes
+            visited = set(state.get("visited", []))
+            pages_visited = int(state.get("pages_visited", 0))
+            elements_seen = int(state.get("elements_seen", 0))
+        except (ValueError, TypeError):
+            # Corrupt line or state, start over
+            self.discard()
+            return None
+        cursor = CrawlCursor(
+            visited=visited,
+            next_url=state.get("next_url"),
+            next_page=state.get("next_page"),
+            pages_visited=pages_visited,
+            elements_seen=elements_seen,
+            resumed=True,
+        )
+        return cursor, items
+
+    def save(self, cursor: CrawlCursor, new_items: Iterable[Dict[str, Any]]) -> None:
+        """Append one page's items, then record the cursor that follows them."""
+        os.makedirs(self.directory, exist_ok=True)
+        lines = b"".join(json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n" for item in new_items)
+        if lines:
+            with open(self._items_path, "ab") as fh:
+                fh.write(lines)
+            self._items_bytes += len(lines)
+        state = {
+            "fingerprint": self.fingerprint,
+            "saved_at": time.time(),
+            "visited": sorted(cursor.visited),
+            "next_url": cursor.next_url,
+            "next_page": cursor.next_page,
+            "pages_visited": cursor.pages_visited,
+            "elements_seen": cursor.elements_seen,
+            "items_bytes": self._items_bytes,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(state, fh, ensure_ascii=False)
+            os.replace(tmp_path, self._state_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def discard(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._items_bytes = 0
+
+    def _drop_items(self) -> None:
+        try:
+            os.unlink(self._items_path)
+        except OSError:
+            pass
+        self._items_bytes = 0
+
+def _try_lock(path: str) -> Optional[int]:
+    """Open and lock ``path`` without waiting; the fd, or None if it is held elsewhere."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fcntl is None:
+        try:
+            return os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+    while True:
+        fd = os.open(path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        try:
+            # The holder before us may have unlinked the file after we opened it
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+def _unlock(path: str, fd: int) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    os.close(fd)
+
+def _checkpoint_path(checkpoint_id: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, hashlib.sha1(checkpoint_id.encode("utf-8")).hexdigest()[:20])
+
+def _drop_expired(now: float) -> None:
+    try:
+        names = os.listdir(CHECKPOINT_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(CHECKPOINT_DIR, name)
+        if name.endswith(".lock"):
+            # Left behind by a crashed run
+            try:
+                stale = now - os.stat(path).st_mtime > CHECKPOINT_TTL
+            except OSError:
+                continue
+            if stale and fcntl is not None:
+                fd = _try_lock(path)
+                if fd is not None:
+                    _unlock(path, fd)
+            elif stale:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            continue
+        try:
+            touched = os.stat(os.path.join(path, "state.json")).st_mtime
+        except OSError:
+            try:
+                touched = os.stat(path).st_mtime
+            except OSError:
+                continue
+        if now - touched > CHECKPOINT_TTL:
+            fd = _try_lock(path + ".lock")
+            if fd is None:
+                # A run still holds it
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            _unlock(path + ".lock", fd)
+
+def open_checkpoint(checkpoint_id: str, fingerprint: str) -> CrawlCheckpoint:
+    _drop_expired(time.time())
+    return CrawlCheckpoint(_checkpoint_path(checkpoint_id), fingerprint)
+
+def discard_checkpoint(checkpoint_id: str) -> None:
+    """Drop a saved checkpoint, unless a running crawl holds it."""
+    path = _checkpoint_path(checkpoint_id)
+    fd = _try_lock(path + ".lock")
+    if fd is None:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    _unlock(path + ".lock", fd)
@@ -0,0 +1,350 @@
+# scraper-webUI
+# Process-wide pooled HTTP client
+# client.py
+# By G0246
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import PoolManager
+from urllib3.util.retry import Retry
+
+from scraper.httpcache import (
+    DiskCache,
+    StoringStream,
+    is_fresh,
+    is_storable,
+    merge_304_headers,
+    response_from_cache,
+    storable_headers,
+    validators,
+    vary_matches,
+    vary_values,
+)
+from scraper.metrics import ScrapeTimings, observe_request
+from scraper.politeness import THROTTLE_STATUSES, get_scheduler
+
+# Host pools kept alive per adapter, and connections kept per host pool
+POOL_HOSTS = int(os.environ.get("SCRAPER_POOL_HOSTS", "50"))
+POOL_MAXSIZE = int(os.environ.get("SCRAPER_POOL_MAXSIZE", "100"))
+# Concurrent requests allowed against one host by callers that fan out
+MAX_CONCURRENCY_PER_HOST = int(os.environ.get("SCRAPER_MAX_CONCURRENCY_PER_HOST", "4"))
+# Hosts whose slots are kept; past that the least recently used free ones are dropped
+HOST_SLOTS_MAX_ENTRIES = int(os.environ.get("SCRAPER_HOST_SLOTS_MAX_ENTRIES", "1024"))
+# On-disk conditional-GET cache for pages (set SCRAPER_HTTP_CACHE=0 to turn it off)
+HTTP_CACHE_ENABLED = os.environ.get("SCRAPER_HTTP_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+HTTP_CACHE_DIR = os.environ.get("SCRAPER_HTTP_CACHE_DIR", os.path.join(".cache", "http"))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("SCRAPER_HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+class _CountingPoolManager(PoolManager):
+    """PoolManager that remembers how many host pools it had to create."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.pools_created = 0
+
+    def _new_pool(self, scheme, host, port, request_context=None):  # type: ignore[override]
+        self.pools_created += 1
+        return super()._new_pool(scheme, host, port, request_context=request_context)
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools are shared by every session mounting it."""
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):  # type: ignore[override]
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _CountingPoolManager(num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs)
+
+    def send(self, request, **kwargs):  # type: ignore[override]
+        # The session's host throttle runs only here, on the way to the
+        # network, so pages answered from the cache never wait for a token
+        throttle = getattr(request, "throttle", None)
+        if throttle is not None:
+            throttle()
+        response = super().send(request, **kwargs)
+        get_scheduler().observe(request.url, response.status_code, response.headers.get("Retry-After"))
+        return response
+
+    def close(self) -> None:
+        # Shared for the life of the process, see close_all_adapters()
+        pass
+
+    def pool_stats(self) -> Dict[str, Any]:
+        manager = self.poolmanager
+        hosts: Dict[str, Dict[str, int]] = {}
+        # The container lock keeps the pool dict stable while we read it
+        with manager.pools.lock:
+            pools = list(manager.pools._container.items())
+        for key, pool in pools:
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "requests": pool.num_requests,
+                "connections_opened": pool.num_connections,
+                # The LIFO queue is pre-filled with None placeholders for unopened slots
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0,
+            }
+        total_requests = sum(h["requests"] for h in hosts.values())
+        total_connections = sum(h["connections_opened"] for h in hosts.values())
+        return {
+            "pools_created": manager.pools_created,
+            "live_pools": len(hosts),
+            "requests": total_requests,
+            "connections_opened": total_connections,
+            # A request that found an idle keep-alive connection is a hit
+            "connection_hits": max(0, total_requests - total_connections),
+            "connection_misses": total_connections,
+            "hosts": hosts,
+        }
+
+class CachingAdapter(PooledAdapter):
+    """PooledAdapter that answers GETs for pages from the on-disk cache when it can.
+
+    Fresh entries never touch the network. Stale ones are revalidated with the
+    stored ETag/Last-Modified, and a 304 is turned back into the stored 200.
+    A streamed page is stored only if its reader gets to the end of it.
+    Range requests and requests that already carry their own conditional
+    headers go straight through.
+    """
+
+    def __init__(self, cache: DiskCache, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):  # type: ignore[override]
+        def forward(req):
+            return super(CachingAdapter, self).send(req, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        headers = request.headers
+        if (
+            request.method != "GET"
+            or "Range" in headers
+            or "If-None-Match" in headers
+            or "If-Modified-Since" in headers
+            or "no-cache" in headers.get("Cache-Control", "")
+        ):
+            return forward(request)
+
+        url = request.url or ""
+        cached = self.cache.load(url)
+        if cached is not None and not vary_matches(cached[0], headers):
+            # Stored for another variant (User-Agent, say), fetch this one
+            cached = None
+        if cached is not None:
+            meta, body = cached
+            if is_fresh(meta):
+                self.cache.count("hits")
+                return response_from_cache(request, meta, body, self)
+            conditional = validators(meta)
+            if conditional:
+                throttle = getattr(request, "throttle", None)
+                request = request.copy()
+                request.headers.update(conditional)
+                request.throttle = throttle
+
+        response = forward(request)
+        if cached is not None and response.status_code == 304:
+            meta["headers"] = merge_304_headers(meta["headers"], response.headers)
+            response.close()
+            self.cache.store(url, meta["status"], meta["headers"], body, vary_values(meta["headers"], request.headers))
+            self.cache.count("revalidated")
+            return response_from_cache(request, meta, body, self)
+
+        storable = is_storable(response)
+        # Streamed image downloads come through here too, they are not page misses
+        if storable or not stream:
+            self.cache.count("misses")
+        if storable:
+            status, stored_headers = response.status_code, storable_headers(response.headers)
+            vary = vary_values(response.headers, request.headers)
+            if stream:
+                response.raw = StoringStream(response.raw, lambda body: self.cache.store(url, status, stored_headers, body, vary))
+            else:
+                self.cache.store(url, status, stored_headers, response.content, vary)
+        return response
+
+class _PoliteRetry(Retry):
+    """Retry that tells the host scheduler about every 429/503 it retries."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):  # type: ignore[override]
+        if response is not None and _pool is not None and response.status in THROTTLE_STATUSES:
+            default_port = {"http": 80, "https": 443}.get(_pool.scheme)
+            netloc = _pool.host if _pool.port in (None, default_port) else f"{_pool.host}:{_pool.port}"
+            get_scheduler().observe(f"{_pool.scheme}://{netloc}/", response.status, response.headers.get("Retry-After"))
+        return super().increment(method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+
+class PooledSession(requests.Session):
+    """Per-scrape session (headers, cookies) on top of the shared adapters.
+
+    Every request that goes to the network waits for its host's token
+    bucket first; fresh HTTP cache hits do not. ``rate_limit``
+    caps the per-host rate for this session only, and ``crawl_delay_for``
+    (url -> seconds) feeds robots.txt Crawl-delay into the bucket.
+    ``user_agents`` (() -> (user_agent, is_mobile)), when set, picks the
+    User-Agent of every request instead of the session header.
+    """
+
+    rate_limit: Optional[float] = None
+    crawl_delay_for: Optional[Callable[[str], Optional[float]]] = None
+    user_agents: Optional[Callable[[], Tuple[str, bool]]] = None
+    timings: Optional[ScrapeTimings] = None
+
+    def send(self, request, **kwargs):  # type: ignore[override]
+        if self.user_agents is not None:
+            user_agent, is_mobile = self.user_agents()
+            request.headers["User-Agent"] = user_agent
+            if is_mobile:
+                request.headers["Viewport-Width"] = "360"
+            else:
+                request.headers.pop("Viewport-Width", None)
+        waited = [0.0]
+
+        def throttle() -> None:
+            # Called by the adapter only when the request goes to the network
+            throttle_start = time.perf_counter()
+            crawl_delay = self.crawl_delay_for(request.url) if self.crawl_delay_for else None
+            get_scheduler().acquire(request.url, rate_cap=self.rate_limit, crawl_delay=crawl_delay)
+            waited[0] = time.perf_counter() - throttle_start
+
+        request.throttle = throttle
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        total = time.perf_counter() - start - waited[0]
+
+        # elapsed stops at the response headers; a non-streamed body is read before send returns
+        from_cache = getattr(response, "from_cache", False)
+        fetch = min(total, response.elapsed.total_seconds() - waited[0]) if not from_cache else total
+        streamed = kwargs.get("stream", False)
+        history = getattr(getattr(response.raw, "retries", None), "history", None) or ()
+        size = len(response.content) if not streamed and response.content else 0
+        observe_request(fetch, len(history), from_cache)
+        if self.timings is not None:
+            self.timings.count_response(fetch, 0.0 if streamed else total - fetch, size, len(history), from_cache)
+        return response
+
+    def close(self) -> None:
+        # Leave the shared pools alone, only drop what belongs to this session
+        self.cookies.clear()
+
+_adapters: Dict[Tuple[int, float], PooledAdapter] = {}
+_adapters_lock = threading.Lock()
+_http_cache: Optional[DiskCache] = None
+_http_cache_lock = threading.Lock()
+
+def get_http_cache() -> Optional[DiskCache]:
+    """The process-wide page cache, created on first use (None when disabled)."""
+    global _http_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = DiskCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+        return _http_cache
+
+def get_http_cache_stats() -> Dict[str, Any]:
+    cache = get_http_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+def get_shared_adapter(total_retries: int, backoff_factor: float) -> PooledAdapter:
+    # One adapter per retry policy, since urllib3 binds Retry to the adapter
+    key = (total_retries, backoff_factor)
+    with _adapters_lock:
+        adapter = _adapters.get(key)
+        if adapter is None:
+            retry_strategy = _PoliteRetry(
+                total=total_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=[429, 500, 502, 503, 504],
+                # Optimize retries by avoiding retries on POST/PUT/PATCH
+                allowed_methods=["HEAD", "GET", "OPTIONS"]
+            )
+            pool_kwargs = dict(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=retry_strategy,
+                pool_block=False      # Don't block when pool is full
+            )
+            cache = get_http_cache()
+            adapter = CachingAdapter(cache, **pool_kwargs) if cache is not None else PooledAdapter(**pool_kwargs)
+            _adapters[key] = adapter
+        return adapter
+
+def new_session(
+    headers: Optional[Dict[str, str]] = None,
+    total_retries: int = 2,
+    backoff_factor: float = 0.3,
+    rate_limit: Optional[float] = None,
+    crawl_delay_for: Optional[Callable[[str], Optional[float]]] = None,
+    user_agents: Optional[Callable[[], Tuple[str, bool]]] = None,
+) -> PooledSession:
+    session = PooledSession()
+    if headers:
+        session.headers.update(headers)
+    session.rate_limit = rate_limit
+    session.crawl_delay_for = crawl_delay_for
+    session.user_agents = user_agents
+    adapter = get_shared_adapter(total_retries, backoff_factor)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_pool_stats() -> Dict[str, Any]:
+    with _adapters_lock:
+        adapters = list(_adapters.items())
+    per_adapter = {
+        f"retries={retries},backoff={backoff}": adapter.pool_stats()
+        for (retries, backoff), adapter in adapters
+    }
+    totals = {"pools_created": 0, "live_pools": 0, "requests": 0, "connection_hits": 0, "connection_misses": 0}
+    for stats in per_adapter.values():
+        for name in totals:
+            totals[name] += stats[name]
+    return {"pool_hosts": POOL_HOSTS, "pool_maxsize": POOL_MAXSIZE, **totals, "adapters": per_adapter}
+
+def close_all_adapters() -> None:
+    with _adapters_lock:
+        adapters = list(_adapters.values())
+        _adapters.clear()
+    for adapter in adapters:
+        adapter.poolmanager.clear()
+
+class _HostSlots:
+    def __init__(self) -> None:
+        self.semaphore = threading.BoundedSemaphore(max(1, MAX_CONCURRENCY_PER_HOST))
+        self.users = 0  # Holding or waiting for a slot, guarded by _host_slots_lock
+
+# host -> slots, least recently used first
+_host_slots: "OrderedDict[str, _HostSlots]" = OrderedDict()
+_host_slots_lock = threading.Lock()
+
+@contextmanager
+def host_slot(url: str) -> Iterator[None]:
+    """Hold one of the MAX_CONCURRENCY_PER_HOST request slots for the URL's host."""
+    host = (urlparse(url).netloc or "").lower()
+    with _host_slots_lock:
+        slots = _host_slots.get(host)
+        if slots is None:
+            slots = _HostSlots()
+            _host_slots[host] = slots
+            if len(_host_slots) > HOST_SLOTS_MAX_ENTRIES:
+                # Only hosts nobody is using can go, their semaphore is back to full
+                excess = len(_host_slots) - HOST_SLOTS_MAX_ENTRIES
+                for idle in [h for h, s in _host_slots.items() if s.users == 0 and h != host][:excess]:
+                    del _host_slots[idle]
+        else:
+            _host_slots.move_to_end(host)
+        slots.users += 1
+    try:
+        with slots.semaphore:
+            yield
+    finally:
+        with _host_slots_lock:
+            slots.users -= 1
@@ -5,22 +5,30 @@
 
 from __future__ import annotations
 
+import re
 import time
 import concurrent.futures
+from collections import deque
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Callable, Dict, Any
-from urllib.parse import urlparse, urljoin
+from typing import Collection, Iterable, Iterator, List, Optional, Callable, Deque, Dict, Any, Set, Tuple
+from urllib.parse import urljoin
 
 import bs4
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
 from requests import Response
-from urllib import robotparser
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from scraper.checkpoints import CrawlCheckpoint, CrawlCursor, crawl_fingerprint, open_checkpoint
+from scraper.client import MAX_CONCURRENCY_PER_HOST, host_slot, new_session
+from scraper.detail_index import get_detail_index
+from scraper.metrics import ScrapeTimings, record_scrape, timings_for
+from scraper.robots import get_robots_cache
+from scraper.selectors import build_strainer, compile_xpath, css_to_xpath, element_matches, parse_simple_selector
 
 # Import the dynamic user agent generator
-from scraper.gen_UA import get_random_user_agent, UserAgentGenerator
+from scraper.gen_UA import UA_RING_SIZE, get_random_user_agent, get_user_agent_ring_stats, user_agent_rotation, UserAgentGenerator
 
 DEFAULT_USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -28,8 +36,8 @@ DEFAULT_USER_AGENT = (
     "Chrome/126.0 Safari/537.36"
 )
 
-# Cache for robots.txt parsers to avoid repeated fetches
-_robots_cache: Dict[str, robotparser.RobotFileParser] = {}
+CSS_SELECTOR_TYPES = {"css", "selector", "query"}
+XPATH_SELECTOR_TYPES = {"xpath"}
 
 # Not used
 DESKTOP_USER_AGENTS = [
@@ -44,46 +52,144 @@ MOBILE_USER_AGENTS = [
 ]
 
 def get_user_agent_stats() -> Dict[str, Any]:
+    if UA_RING_SIZE > 0:
+        mode, description = "ring", f"Each request takes the next of {UA_RING_SIZE} pre-generated user agents"
+    else:
+        mode, description = "dynamic", "Each request gets a freshly generated user agent"
     return {
-        "mode": "dynamic",
-        "description": "User agents are generated fresh on every request using common patterns",
+        "mode": mode,
+        "rotation": "per_request",
+        "description": description + " (sessions given an explicit user agent keep it)",
         "desktop_browsers": ["Chrome", "Firefox", "Safari", "Edge"],
         "mobile_browsers": ["Chrome (Android)", "Safari (iOS)", "Safari (iPad)", "Firefox (Android)"],
         "os_platforms": ["Windows", "macOS", "Linux", "Android", "iOS"],
-        "note": "Each request generates a unique user agent with random versions",
+        "ring": get_user_agent_ring_stats(),
         "fallback_desktop": len(DESKTOP_USER_AGENTS),
         "fallback_mobile": len(MOBILE_USER_AGENTS),
     }
 
+class ScrapeCancelled(RuntimeError):
+    """Raised when a scrape notices its is_canceled callback returned True."""
+
+# Longest HTML snippet kept per item
+MAX_ITEM_HTML = 5000
+# Detail pages are read in chunks of this size until the image element shows up
+DETAIL_CHUNK_BYTES = 16 * 1024
+# After the match, read at most this much more so the connection can be reused
+DETAIL_DRAIN_BYTES = 64 * 1024
+
+class ScrapeItem:
+    """One scraped element. Reads like the dict items used to be.
+
+    Slots instead of a per-item dict keep big result sets small. Templates
+    use attribute access, exporters and csv.DictWriter use item["key"] and
+    item.get(), and to_dict() gives the plain dict for JSON.
+    """
+
+    __slots__ = ("index", "tag", "text", "href", "attribute_value", "image_url", "detail_url", "html")
+    FIELDS = __slots__
+
+    def __init__(
+        self,
+        index: int = 0,
+        tag: str = "",
+        text: Optional[str] = None,
+        href: Optional[str] = None,
+        attribute_value: Optional[str] = None,
+        image_url: Optional[str] = None,
+        detail_url: Optional[str] = None,
+        html: Optional[str] = None,
+    ) -> None:
+        self.index = index
+        self.tag = tag
+        self.text = text
+        self.href = href
+        self.attribute_value = attribute_value
+        self.image_url = image_url
+        self.detail_url = detail_url
+        self.html = html
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (ScrapeItem, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def values(self) -> List[Any]:
+        return [getattr(self, name) for name in self.FIELDS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name)) for name in self.FIELDS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"ScrapeItem({self.to_dict()!r})"
+
+def parse_fields(fields: Any) -> Optional[Tuple[str, ...]]:
+    """Normalize a fields= projection ("text,href" or a list) to ScrapeItem field order.
+
+    None or empty means every field. Unknown names raise ValueError.
+    """
+    if not fields:
+        return None
+    names = fields.split(",") if isinstance(fields, str) else list(fields)
+    wanted = {name.strip().lower() for name in names if name and name.strip()}
+    unknown = sorted(wanted - set(ScrapeItem.FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown item field(s): {', '.join(unknown)}. Choose from: {', '.join(ScrapeItem.FIELDS)}.")
+    return tuple(name for name in ScrapeItem.FIELDS if name in wanted) or None
+
 @dataclass
 class ScrapeResult:
     url: str
     selector: str
     selector_type: str
-    items: List[dict]
+    items: List[ScrapeItem]
     elapsed_ms: int
+    # Stage durations and counters, see scraper.metrics.ScrapeTimings.to_dict
+    timings: Optional[Dict[str, Any]] = None
 
 def is_allowed_by_robots(url: str, user_agent: str = "scraper-webUI") -> bool:
-    parsed = urlparse(url)
-    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-    
-    # Check cache first to avoid repeated fetches
-    if robots_url in _robots_cache:
-        robot_bouncer = _robots_cache[robots_url]
-        try:
-            return robot_bouncer.can_fetch(user_agent, url)
-        except Exception:
-            return True
-    
-    # Fetch and cache if not found
-    robot_bouncer = robotparser.RobotFileParser()
-    try:
-        robot_bouncer.set_url(robots_url)
-        robot_bouncer.read()
-        _robots_cache[robots_url] = robot_bouncer
-        return robot_bouncer.can_fetch(user_agent, url)
-    except Exception:
-        return True
+    return get_robots_cache().can_fetch(url, user_agent)
+
+def _robots_guard(respect_robots: bool, user_agent: Optional[str]) -> Optional[Callable[[str], bool]]:
+    """URL check for the pages a scrape discovers by itself (next pages, detail pages)."""
+    if not respect_robots:
+        return None
+    robots_agent = user_agent or "scraper-webUI"
+    return lambda url: is_allowed_by_robots(url, robots_agent)
+
+def _crawl_delay_lookup(respect_robots: bool, user_agent: Optional[str]) -> Optional[Callable[[str], Optional[float]]]:
+    if not respect_robots:
+        return None
+    robots_agent = user_agent or "scraper-webUI"
+    return lambda url: get_robots_cache().crawl_delay(url, robots_agent)
 
 def _pick_user_agent(explicit_user_agent: Optional[str], prefer_mobile: bool = False) -> str:
     if explicit_user_agent:
@@ -119,26 +225,26 @@ def _build_headers(user_agent: Optional[str], prefer_mobile: bool = False) -> di
 
     return headers
 
-def create_session(user_agent: Optional[str], fast_mode: bool = False, retries: int = 2, prefer_mobile: bool = False) -> requests.Session:
-    session = requests.Session()
-    session.headers.update(_build_headers(user_agent, prefer_mobile))
+def create_session(
+    user_agent: Optional[str],
+    fast_mode: bool = False,
+    retries: int = 2,
+    prefer_mobile: bool = False,
+    rate_limit: Optional[float] = None,
+    respect_robots: bool = False,
+) -> requests.Session:
+    # Connection pools are shared process-wide, the session only carries headers and cookies
     total_retries = 0 if fast_mode else max(0, retries)
-    retry_strategy = Retry(
-        total=total_retries, 
-        backoff_factor=(0.15 if fast_mode else 0.3), 
-        status_forcelist=[429, 500, 502, 503, 504],
-        # Optimize retries by avoiding retries on POST/PUT/PATCH
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    # Increase pool sizes for better concurrent performance
-    adapter = HTTPAdapter(
-        pool_connections=50,  # Increased from 20
-        pool_maxsize=100,     # Increased from 50
-        max_retries=retry_strategy,
-        pool_block=False      # Don't block when pool is full
+    session = new_session(
+        headers=_build_headers(user_agent, prefer_mobile),
+        total_retries=total_retries,
+        backoff_factor=(0.15 if fast_mode else 0.3),
+        rate_limit=rate_limit,
+        crawl_delay_for=_crawl_delay_lookup(respect_robots, user_agent),
+        # No explicit UA: rotate it on every request
+        user_agents=(None if user_agent else user_agent_rotation(prefer_mobile)),
     )
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
+    session.timings = ScrapeTimings()
     return session
 
 def _http_get(url: str, session: requests.Session, timeout_seconds: Optional[int] = None) -> Response:
@@ -146,6 +252,96 @@ def _http_get(url: str, session: requests.Session, timeout_seconds: Optional[int
     response.raise_for_status()
     return response
 
+def _is_xpath(selector_type: Optional[str]) -> bool:
+    return (selector_type or "css").lower() in XPATH_SELECTOR_TYPES
+
+def _check_selector_type(selector_type: str) -> None:
+    if (selector_type or "").lower() not in CSS_SELECTOR_TYPES | XPATH_SELECTOR_TYPES:
+        raise ValueError("Unknown selector_type. Use 'css' or 'xpath'.")
+
+def _run_xpath(expression: str, context: Any) -> List[Any]:
+    try:
+        result = compile_xpath(expression)(context)
+    except etree.XPathError as exc:
+        raise ValueError(f"Invalid XPath expression {expression!r}: {exc}") from exc
+    # count(), boolean() and friends return a scalar
+    return result if isinstance(result, list) else [result]
+
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+def _lxml_document(html: str) -> lxml.html.HtmlElement:
+    if not html.strip():
+        html = "<html></html>"
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that still carries an encoding declaration
+        return lxml.html.document_fromstring(_XML_DECLARATION.sub("", html, count=1) or "<html></html>")
+
+class _LxmlTag:
+    """Wraps an lxml element in the slice of the bs4.Tag API the scraper uses.
+
+    With selector_type="xpath" pages are parsed by lxml directly, and
+    select()/select_one() take XPath instead of CSS. select_one() may return
+    a plain string when the expression selects an attribute or text.
+    """
+
+    __slots__ = ("_el",)
+
+    def __init__(self, element: lxml.html.HtmlElement) -> None:
+        self._el = element
+
+    @property
+    def name(self) -> str:
+        return self._el.tag if isinstance(self._el.tag, str) else ""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._el.get(key, default)
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        parts = self._el.itertext()
+        if strip:
+            parts = (part.strip() for part in parts)
+            return separator.join(part for part in parts if part)
+        return separator.join(parts)
+
+    def select(self, expression: str) -> List["_LxmlTag"]:
+        matches = _run_xpath(expression, self._el)
+        elements = [_LxmlTag(m) for m in matches if isinstance(m, etree._Element) and isinstance(m.tag, str)]
+        if matches and not elements:
+            # //a/@href or //h3/text() would otherwise quietly give no items
+            raise ValueError(f"XPath item selector must select elements: {expression!r}")
+        return elements
+
+    def select_one(self, expression: str) -> Any:
+        for match in _run_xpath(expression, self._el):
+            if isinstance(match, etree._Element):
+                if isinstance(match.tag, str):
+                    return _LxmlTag(match)
+            elif isinstance(match, str):
+                return str(match)
+        return None
+
+    def find_parent(self, name: str) -> Optional["_LxmlTag"]:
+        for ancestor in self._el.iterancestors(name):
+            return _LxmlTag(ancestor)
+        return None
+
+    def __str__(self) -> str:
+        return lxml.html.tostring(self._el, encoding="unicode", with_tail=False)
+
+def _matched_value(match: Any, attribute_name: str) -> Optional[str]:
+    # XPath may select the attribute or text itself instead of an element
+    if match is None or isinstance(match, str):
+        return match
+    return match.get(attribute_name)
+
+def _parse_listing(html: str, selector_type: str, strainer: Optional[SoupStrainer] = None) -> Any:
+    """Parse a listing page: lxml for XPath selectors, bs4 (maybe strained) for CSS."""
+    if _is_xpath(selector_type):
+        return _LxmlTag(_lxml_document(html))
+    return BeautifulSoup(html, "lxml", parse_only=strainer)
+
 def _resolve_link(base_url: str, element: bs4.Tag) -> Optional[str]:
     href = element.get("href")
     if href:
@@ -218,7 +414,7 @@ def _find_detail_url(base_url: str, element: bs4.Tag, detail_url_selector: Optio
         try:
             sub = element.select_one(detail_url_selector)
             if sub:
-                href = sub.get(detail_url_attribute or "href")
+                href = _matched_value(sub, detail_url_attribute or "href")
                 if href:
                     return _to_absolute_url(base_url, href)
         except Exception:
@@ -234,6 +430,32 @@ def _find_detail_url(base_url: str, element: bs4.Tag, detail_url_selector: Optio
     return None
 
 
+def _capped_html(element: Any, limit: int = MAX_ITEM_HTML) -> str:
+    """str(element), but serialization stops once ``limit`` characters are out."""
+    event_stream = getattr(element, "_event_stream", None)
+    if event_stream is None:
+        html_str = str(element)
+    else:
+        # Same pieces Tag.decode() joins, without its (unused) pretty-printing
+        formatter = element.formatter_for_name("minimal")
+        pieces: List[str] = []
+        size = 0
+        for event, node in event_stream():
+            if event is bs4.Tag.END_ELEMENT_EVENT:
+                piece = node._format_tag("utf-8", formatter, opening=False)
+            elif event in (bs4.Tag.START_ELEMENT_EVENT, bs4.Tag.EMPTY_ELEMENT_EVENT):
+                piece = node._format_tag("utf-8", formatter, opening=True)
+            else:
+                piece = node.output_ready(formatter)
+            pieces.append(piece)
+            size += len(piece)
+            if size > limit:
+                break
+        html_str = "".join(pieces)
+    if len(html_str) > limit:  # Truncate very large HTML
+        html_str = html_str[:limit] + "..."
+    return html_str
+
 def _elements_to_items(
     base_url: str,
     elements: Iterable[bs4.Tag],
@@ -242,97 +464,212 @@ def _elements_to_items(
     detail_url_attribute: str = "href",
     detail_image_selector: Optional[str] = None,
     detail_image_attribute: str = "src",
-) -> List[dict]:
-    items: List[dict] = []
+    fields: Optional[Collection[str]] = None,
+) -> List[ScrapeItem]:
+    """Build items; with ``fields`` only those are computed and the rest stay None."""
+    wanted = set(ScrapeItem.FIELDS if fields is None else fields)
+    # Detail enrichment needs the detail URL and writes image_url, whatever was asked for
+    if detail_image_selector:
+        wanted.update(("detail_url", "image_url"))
+    items: List[ScrapeItem] = []
     for index, element in enumerate(elements):
-        # Use get_text with separator to be more efficient than strip=True
-        text = element.get_text(separator=" ", strip=True)
-        href = _resolve_link(base_url, element)
-        attribute_value = _extract_attribute(element, attribute_name, base_url)
-        image_url = _image_url_from_element(base_url, element, attribute_name)
-        detail_url = _find_detail_url(base_url, element, detail_url_selector, detail_url_attribute)
-        
-        # Lazily convert to string only when needed - use encode for faster serialization
-        # Limit HTML field length to prevent memory issues with large elements
-        html_str = str(element)
-        if len(html_str) > 5000:  # Truncate very large HTML
-            html_str = html_str[:5000] + "..."
-        
-        items.append(
-            {
-                "index": index,
-                "tag": element.name or "",
-                "text": text,
-                "href": href,
-                "attribute_value": attribute_value,
-                "image_url": image_url,
-                "detail_url": detail_url,
-                "html": html_str,
-            }
-        )
+        item = ScrapeItem(index=index, tag=element.name or "")
+        if "text" in wanted:
+            # Use get_text with separator to be more efficient than strip=True
+            item.text = element.get_text(separator=" ", strip=True)
+        if "href" in wanted:
+            item.href = _resolve_link(base_url, element)
+        if "attribute_value" in wanted:
+            item.attribute_value = _extract_attribute(element, attribute_name, base_url)
+        if "image_url" in wanted:
+            item.image_url = _image_url_from_element(base_url, element, attribute_name)
+        if "detail_url" in wanted:
+            item.detail_url = _find_detail_url(base_url, element, detail_url_selector, detail_url_attribute)
+        if "html" in wanted:
+            item.html = _capped_html(element)
+        items.append(item)
     return items
 
-def _extract_full_image_from_detail(session: requests.Session, detail_url: str, detail_image_selector: str, detail_image_attribute: str) -> Optional[str]:
-    try:
-        resp = session.get(detail_url, timeout=15)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "lxml")
-        el = soup.select_one(detail_image_selector)
-        if not el:
+def _image_url_from_detail_html(
+    html: str,
+    detail_url: str,
+    detail_image_selector: str,
+    detail_image_attribute: str,
+    selector_type: str = "css",
+) -> Optional[str]:
+    # XPath and simple CSS selectors skip bs4 entirely: lxml tree plus a compiled XPath
+    xpath = detail_image_selector if _is_xpath(selector_type) else css_to_xpath(detail_image_selector)
+    if xpath is not None:
+        if not html.strip():
+            return None
+        match = _LxmlTag(_lxml_document(html)).select_one(xpath)
+        return _to_absolute_url(detail_url, _matched_value(match, detail_image_attribute or "src"))
+
+    soup = BeautifulSoup(html, "lxml")
+    el = soup.select_one(detail_image_selector)
+    if not el:
+        return None
+    value = el.get(detail_image_attribute or "src")
+    return _to_absolute_url(detail_url, value)
+
+class _StreamingImageFinder:
+    """Feeds a detail page to lxml chunk by chunk and stops at the first match.
+
+    Only for simple CSS selectors: those can be decided from an element's
+    start tag and its ancestors, so nothing after the match is needed.
+    """
+
+    def __init__(self, chains: Any, detail_url: str, detail_image_attribute: str, encoding: Optional[str] = None) -> None:
+        self.parser = etree.HTMLPullParser(events=("start",), encoding=encoding)
+        self.chains = chains
+        self.detail_url = detail_url
+        self.attribute = detail_image_attribute or "src"
+        self.match: Optional[Any] = None
+
+    @classmethod
+    def for_selector(cls, detail_image_selector: str, selector_type: str, detail_url: str, detail_image_attribute: str, encoding: Optional[str] = None) -> Optional["_StreamingImageFinder"]:
+        if _is_xpath(selector_type):
+            return None
+        chains = parse_simple_selector(detail_image_selector)
+        if chains is None:
+            return None
+        return cls(chains, detail_url, detail_image_attribute, encoding)
+
+    def _scan(self) -> bool:
+        for _, element in self.parser.read_events():
+            if element_matches(self.chains, element):
+                self.match = element
+                return True
+        return False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse one more chunk; True once the image element has been seen."""
+        self.parser.feed(chunk)
+        return self._scan()
+
+    def close(self) -> bool:
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            return False  # Empty page
+        return self._scan()
+
+    def result(self) -> Optional[str]:
+        if self.match is None:
             return None
-        value = el.get(detail_image_attribute or "src")
-        return _to_absolute_url(detail_url, value)
+        return _to_absolute_url(self.detail_url, self.match.get(self.attribute))
+
+def _extract_full_image_from_detail(
+    session: requests.Session,
+    detail_url: str,
+    detail_image_selector: str,
+    detail_image_attribute: str,
+    selector_type: str = "css",
+) -> Optional[str]:
+    timings = timings_for(session)
+    try:
+        with session.get(detail_url, timeout=15, stream=True) as resp:
+            resp.raise_for_status()
+            finder = _StreamingImageFinder.for_selector(
+                detail_image_selector, selector_type, detail_url, detail_image_attribute, resp.encoding
+            )
+            if finder is None:
+                timings.count_bytes(len(resp.content))
+                return _image_url_from_detail_html(resp.text, detail_url, detail_image_selector, detail_image_attribute, selector_type)
+            read = 0
+            try:
+                chunks = resp.iter_content(DETAIL_CHUNK_BYTES)
+                for chunk in chunks:
+                    read += len(chunk)
+                    if finder.feed(chunk):
+                        break
+                else:
+                    finder.close()
+                    return finder.result()
+                # Found early: finish a short remainder so the connection goes back
+                # to the pool (and the page can be cached), else drop the connection
+                drained = 0
+                for chunk in chunks:
+                    drained += len(chunk)
+                    if drained > DETAIL_DRAIN_BYTES:
+                        break
+                read += drained
+                return finder.result()
+            finally:
+                timings.count_bytes(read)
     except Exception:
         return None
 
 def _enrich_items_with_detail_images(
     session: requests.Session,
-    items: List[dict],
+    items: List[ScrapeItem],
     detail_image_selector: str,
     detail_image_attribute: str,
     is_canceled: Optional[Callable[[], bool]] = None,
-    max_workers: int = 8
+    max_workers: int = 8,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    selector_type: str = "css",
+    allowed: Optional[Callable[[str], bool]] = None,
 ) -> None:
     """Fetch detail page images in parallel to enrich items.
     
     Modifies items in-place by updating their image_url field.
     Uses URL deduplication to avoid fetching the same detail page multiple times.
+    Detail pages rejected by ``allowed`` (robots.txt) are not fetched.
     """
-    # Build a map of detail URLs to item indices for deduplication
-    url_to_indices: Dict[str, List[int]] = {}
-    for i, item in enumerate(items):
-        detail_url = item.get("detail_url")
-        if detail_url:
-            if detail_url not in url_to_indices:
-                url_to_indices[detail_url] = []
-            url_to_indices[detail_url].append(i)
-    
-    if not url_to_indices:
-        return
-    
-    # Create unique fetch tasks (one per unique URL)
-    unique_urls = list(url_to_indices.keys())
-    
-    def fetch_detail_image(detail_url):
-        if is_canceled and is_canceled():
-            return detail_url, None
-        full_img = _extract_full_image_from_detail(
-            session=session,
-            detail_url=detail_url,
-            detail_image_selector=detail_image_selector,
-            detail_image_attribute=detail_image_attribute,
-        )
-        return detail_url, full_img
-    
-    # Fetch unique images in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for detail_url, full_img in executor.map(fetch_detail_image, unique_urls):
-            if is_canceled and is_canceled():
-                raise RuntimeError("Cancelled")
-            if full_img:
-                # Update all items that share this detail URL
-                for idx in url_to_indices[detail_url]:
+    with timings_for(session).measure("detail"):
+        # Build a map of detail URLs to item indices for deduplication
+        url_to_indices: Dict[str, List[int]] = {}
+        for i, item in enumerate(items):
+            detail_url = item.get("detail_url")
+            if detail_url and (allowed is None or allowed(detail_url)):
+                if detail_url not in url_to_indices:
+                    url_to_indices[detail_url] = []
+                url_to_indices[detail_url].append(i)
+
+        if not url_to_indices:
+            return
+
+        # Pages resolved by an earlier scrape are not fetched again
+        index = get_detail_index()
+        if index is not None:
+            known = index.lookup_many(url_to_indices, detail_image_selector, detail_image_attribute, selector_type)
+            for detail_url, full_img in known.items():
+                for idx in url_to_indices.pop(detail_url):
                     items[idx]["image_url"] = full_img
+            if not url_to_indices:
+                return
+
+        # Create unique fetch tasks (one per unique URL)
+        unique_urls = list(url_to_indices.keys())
+        resolved: List[Tuple[str, str]] = []
+
+        def fetch_detail_image(detail_url):
+            if is_canceled and is_canceled():
+                return detail_url, None
+            full_img = _extract_full_image_from_detail(
+                session=session,
+                detail_url=detail_url,
+                detail_image_selector=detail_image_selector,
+                detail_image_attribute=detail_image_attribute,
+                selector_type=selector_type,
+            )
+            return detail_url, full_img
+
+        # Fetch unique images in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for done, (detail_url, full_img) in enumerate(executor.map(fetch_detail_image, unique_urls), start=1):
+                if is_canceled and is_canceled():
+                    raise ScrapeCancelled("Cancelled")
+                if progress_cb and (done % 10 == 0 or done == len(unique_urls)):
+                    progress_cb({"stage": "detail", "items": done, "total": len(unique_urls)})
+                if full_img:
+                    resolved.append((detail_url, full_img))
+                    # Update all items that share this detail URL
+                    for idx in url_to_indices[detail_url]:
+                        items[idx]["image_url"] = full_img
+        if index is not None:
+            index.store_many(resolved, detail_image_selector, detail_image_attribute, selector_type)
 
 def scrape_with_selector(
     url: str,
@@ -347,28 +684,33 @@ def scrape_with_selector(
     detail_image_attribute: str = "src",
     fast_mode: bool = False,
     progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
-    is_canceled: Optional[Callable[[], bool]] = None
+    is_canceled: Optional[Callable[[], bool]] = None,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
 ) -> ScrapeResult:
     start_time = time.perf_counter()
-    session = create_session(user_agent, fast_mode=fast_mode)
+    if is_canceled and is_canceled():
+        raise ScrapeCancelled("Cancelled")
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    session = create_session(user_agent, fast_mode=fast_mode, rate_limit=rate_limit, respect_robots=respect_robots)
+    timings = timings_for(session)
     response = _http_get(url, session=session)
-    html = response.text
-
-    soup = BeautifulSoup(html, "lxml")
 
-    if selector_type.lower() in {"css", "selector", "query"}:
-        elements = soup.select(selector)
-    elif selector_type.lower() in {"xpath"}:
-        # Minimal xpath support using select from SoupSieve does not support XPATH; require parsel/lxml if needed later
-        raise ValueError("XPATH is not supported in this minimal build. Use CSS selectors.")
-    else:
-        raise ValueError("Unknown selector_type. Use 'css'.")
+    strainer = _listing_strainer(lean_parse, selector_type, selector, None, detail_url_selector, detail_image_selector)
+    _, elements = _read_listing_page(response, selector_type, selector, strainer, timings)
 
     if max_items is not None and max_items >= 0:
         # Slice early to avoid converting unnecessary elements
         elements = elements[: max(0, max_items)]
 
-    items = _elements_to_items(url, elements, attribute_name, detail_url_selector, detail_url_attribute, detail_image_selector, detail_image_attribute)
+    with timings.measure("items"):
+        items = _elements_to_items(
+            url, elements, attribute_name, detail_url_selector, detail_url_attribute,
+            detail_image_selector, detail_image_attribute, fields=fields,
+        )
 
     # Optionally enrich/override image_url by visiting detail pages (in parallel)
     if detail_image_selector:
@@ -378,33 +720,329 @@ def scrape_with_selector(
             detail_image_selector=detail_image_selector,
             detail_image_attribute=detail_image_attribute,
             is_canceled=is_canceled,
-            max_workers=8
+            max_workers=8,
+            progress_cb=progress_cb,
+            selector_type=selector_type,
+            allowed=_robots_guard(respect_robots, user_agent),
         )
 
     if progress_cb:
         progress_cb({"stage": "done", "items": len(items), "url": url})
 
-    elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+    elapsed = time.perf_counter() - start_time
+    record_scrape("single", timings, elapsed)
     return ScrapeResult(
         url=url,
         selector=selector,
         selector_type=selector_type,
         items=items,
-        elapsed_ms=elapsed_ms,
+        elapsed_ms=int(elapsed * 1000),
+        timings=timings.to_dict(),
     )
 
-def _find_next_url(base_url: str, soup: BeautifulSoup, next_selector: Optional[str]) -> Optional[str]:
+@dataclass
+class BatchPage:
+    """Result for one URL of a batch: its items, or why there are none."""
+
+    url: str
+    items: List[ScrapeItem]
+    error: Optional[str] = None
+    elapsed_ms: int = 0
+
+def iter_batch(
+    urls: Iterable[str],
+    selector_type: str,
+    selector: str,
+    attribute_name: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    max_items: Optional[int] = None,
+    detail_url_selector: Optional[str] = None,
+    detail_url_attribute: str = "href",
+    detail_image_selector: Optional[str] = None,
+    detail_image_attribute: str = "src",
+    fast_mode: bool = False,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
+    max_workers: int = 16,
+) -> Iterator[BatchPage]:
+    """Run one selector config over many URLs and yield a BatchPage per URL.
+
+    Pages are fetched ``max_workers`` at a time over one session, with at
+    most MAX_CONCURRENCY_PER_HOST requests per host, and come out in the
+    order they finish. ``max_items`` applies to each URL. A URL that fails
+    (HTTP error, timeout, robots.txt) gets a BatchPage with ``error`` set
+    instead of stopping the batch. Repeated URLs are scraped once.
+    """
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    session = create_session(user_agent, fast_mode=fast_mode, rate_limit=rate_limit, respect_robots=respect_robots)
+    strainer = _listing_strainer(lean_parse, selector_type, selector, None, detail_url_selector, detail_image_selector)
+    allowed = _robots_guard(respect_robots, user_agent)
+    timings = timings_for(session)
+    batch_start = time.perf_counter()
+
+    def scrape_one(url: str) -> BatchPage:
+        start_time = time.perf_counter()
+        if is_canceled and is_canceled():
+            return BatchPage(url, [], "Cancelled")
+        if allowed is not None and not allowed(url):
+            return BatchPage(url, [], "Disallowed by robots.txt")
+        try:
+            with host_slot(url):
+                response = _http_get(url, session=session)
+            _, elements = _read_listing_page(response, selector_type, selector, strainer, timings)
+            if max_items is not None and max_items >= 0:
+                elements = elements[: max(0, max_items)]
+            with timings.measure("items"):
+                items = _elements_to_items(
+                    url, elements, attribute_name, detail_url_selector, detail_url_attribute,
+                    detail_image_selector, detail_image_attribute, fields=fields,
+                )
+            if detail_image_selector:
+                _enrich_items_with_detail_images(
+                    session=session,
+                    items=items,
+                    detail_image_selector=detail_image_selector,
+                    detail_image_attribute=detail_image_attribute,
+                    is_canceled=is_canceled,
+                    max_workers=4,
+                    selector_type=selector_type,
+                    allowed=allowed,
+                )
+        except (requests.RequestException, ValueError) as exc:
+            return BatchPage(url, [], str(exc), int((time.perf_counter() - start_time) * 1000))
+        for idx, item in enumerate(items):
+            item["index"] = idx
+        return BatchPage(url, items, None, int((time.perf_counter() - start_time) * 1000))
+
+    todo = iter(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    in_flight: Set[concurrent.futures.Future] = set()
+    finished = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        try:
+            while True:
+                for url in todo:
+                    in_flight.add(executor.submit(scrape_one, url))
+                    if len(in_flight) >= max_workers:
+                        break
+                if not in_flight:
+                    record_scrape("batch", timings, time.perf_counter() - batch_start)
+                    return
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    page = future.result()
+                    if is_canceled and is_canceled():
+                        raise ScrapeCancelled("Cancelled")
+                    finished += 1
+                    if progress_cb:
+                        progress_cb({"stage": "batch", "pages_visited": finished, "items": len(page.items), "url": page.url})
+                    yield page
+        finally:
+            # Caller stopped early: drop the URLs not started yet
+            for future in in_flight:
+                future.cancel()
+
+def _find_next_url(base_url: str, soup: Any, next_selector: Optional[str]) -> Optional[str]:
     if not next_selector:
         return None
     try:
         el = soup.select_one(next_selector)
         if not el:
             return None
-        href = el.get("href")
+        href = _matched_value(el, "href")
         return urljoin(base_url, href) if href else None
     except Exception:
         return None
 
+def _listing_strainer(
+    lean_parse: bool,
+    selector_type: str,
+    selector: str,
+    next_selector: Optional[str] = None,
+    detail_url_selector: Optional[str] = None,
+    detail_image_selector: Optional[str] = None,
+) -> Optional[SoupStrainer]:
+    """SoupStrainer for lean parsing of listing pages, or None for a full parse.
+
+    Only the subtrees that can hold a match (or the next link) are built, so
+    anything outside them is gone: items lose the parent-link fallback for
+    detail_url. Detail enrichment that relies on that fallback keeps the full
+    parse.
+    """
+    if not lean_parse or selector_type.lower() not in CSS_SELECTOR_TYPES:
+        return None
+    if detail_image_selector and not detail_url_selector:
+        return None
+    return build_strainer(selector, next_selector)
+
+def _select_page_elements(soup: Any, selector_type: str, selector: str) -> List[bs4.Tag]:
+    # For XPath the soup is an _LxmlTag whose select() takes XPath
+    _check_selector_type(selector_type)
+    return soup.select(selector)
+
+
+def _read_listing_page(response: Response, selector_type: str, selector: str, strainer: Optional[SoupStrainer], timings: ScrapeTimings) -> Tuple[Any, List[bs4.Tag]]:
+    """Parse a listing response and run the item selector on it, timing both."""
+    with timings.measure("parse"):
+        soup = _parse_listing(response.text, selector_type, strainer)
+    with timings.measure("select"):
+        elements = _select_page_elements(soup, selector_type, selector)
+    timings.count_page()
+    return soup, elements
+
+def _iter_next_link_pages(
+    url: str,
+    session: requests.Session,
+    selector_type: str,
+    selector: str,
+    next_selector: Optional[str],
+    max_pages: Optional[int],
+    max_items: Optional[int],
+    is_canceled: Optional[Callable[[], bool]],
+    pipeline: bool,
+    strainer: Optional[SoupStrainer] = None,
+    allowed: Optional[Callable[[str], bool]] = None,
+    cursor: Optional[CrawlCursor] = None,
+) -> Iterator[Tuple[str, List[bs4.Tag]]]:
+    """Follow next links from ``url``.
+
+    With a ``cursor`` the visited set and counters continue from it, and
+    ``cursor.next_url`` is set to the following page before each yield.
+    """
+    # With pipelining on, the next page is already downloading while the caller builds items
+    prefetcher = concurrent.futures.ThreadPoolExecutor(max_workers=1) if pipeline else None
+    pending: Optional[concurrent.futures.Future] = None
+    timings = timings_for(session)
+    url_graveyard: set = cursor.visited if cursor is not None else set()  # Track visited URLs to avoid infinite loops
+    current_url: Optional[str] = url
+    pages_visited = cursor.pages_visited if cursor is not None else 0
+    elements_seen = cursor.elements_seen if cursor is not None else 0
+    try:
+        while current_url:
+            if is_canceled and is_canceled():
+                raise ScrapeCancelled("Cancelled")
+
+            # Check if we've been here before (avoid infinite loops)
+            if current_url in url_graveyard:
+                break
+            url_graveyard.add(current_url)
+
+            response = pending.result() if pending is not None else _http_get(current_url, session=session)
+            pending = None
+            soup, elements = _read_listing_page(response, selector_type, selector, strainer, timings)
+            pages_visited += 1
+            elements_seen += len(elements)
+
+            next_url: Optional[str] = None
+            out_of_pages = max_pages is not None and pages_visited >= max_pages
+            out_of_items = max_items is not None and elements_seen >= max_items
+            if not out_of_pages and not out_of_items:
+                next_url = _find_next_url(current_url, soup, next_selector)
+                if next_url == current_url or next_url in url_graveyard:
+                    next_url = None
+                if next_url and allowed is not None and not allowed(next_url):
+                    next_url = None
+                if next_url and prefetcher is not None:
+                    pending = prefetcher.submit(_http_get, next_url, session)
+
+            if cursor is not None:
+                cursor.next_url = next_url
+                cursor.pages_visited = pages_visited
+                cursor.elements_seen = elements_seen
+            yield current_url, elements
+            current_url = next_url
+    finally:
+        if pending is not None:
+            pending.cancel()
+        if prefetcher is not None:
+            prefetcher.shutdown(wait=False)
+
+def _fetch_template_page(url: str, session: requests.Session) -> Response:
+    with host_slot(url):
+        return session.get(url, timeout=15)
+
+def _iter_template_pages(
+    page_url_template: str,
+    session: requests.Session,
+    selector_type: str,
+    selector: str,
+    page_start: int,
+    page_window: int,
+    max_pages: Optional[int],
+    max_items: Optional[int],
+    is_canceled: Optional[Callable[[], bool]],
+    strainer: Optional[SoupStrainer] = None,
+    allowed: Optional[Callable[[str], bool]] = None,
+    cursor: Optional[CrawlCursor] = None,
+) -> Iterator[Tuple[str, List[bs4.Tag]]]:
+    """Fetch numbered pages a window at a time and yield them in page order.
+
+    Stops at the first page that is missing (404/410), matches nothing,
+    redirects back to a page we have already seen, or is disallowed. With a
+    ``cursor`` numbering resumes at ``cursor.next_page``, which is kept up
+    to date before each yield.
+    """
+    if "{n}" not in page_url_template:
+        raise ValueError("page_url_template must contain a {n} placeholder.")
+    window = max(1, min(page_window, MAX_CONCURRENCY_PER_HOST))
+    last_page = page_start + max(1, max_pages) - 1 if max_pages is not None else None
+    fetcher = concurrent.futures.ThreadPoolExecutor(max_workers=window)
+    in_flight: Deque[Tuple[int, str, concurrent.futures.Future]] = deque()
+    next_number = page_start
+    url_graveyard: set = set()
+    elements_seen = 0
+    timings = timings_for(session)
+    if cursor is not None:
+        url_graveyard = cursor.visited
+        elements_seen = cursor.elements_seen
+        if cursor.next_page is not None:
+            next_number = cursor.next_page
+
+    def top_up() -> None:
+        nonlocal next_number, last_page
+        while len(in_flight) < window and (last_page is None or next_number <= last_page):
+            page_url = page_url_template.replace("{n}", str(next_number))
+            if allowed is not None and not allowed(page_url):
+                last_page = next_number - 1
+                return
+            in_flight.append((next_number, page_url, fetcher.submit(_fetch_template_page, page_url, session)))
+            next_number += 1
+
+    try:
+        if max_items is None or elements_seen < max_items:
+            top_up()
+        while in_flight:
+            if is_canceled and is_canceled():
+                raise ScrapeCancelled("Cancelled")
+            number, page_url, future = in_flight.popleft()
+            response = future.result()
+            if response.status_code in (404, 410):
+                break
+            response.raise_for_status()
+            if response.url in url_graveyard:
+                break
+            url_graveyard.add(response.url)
+
+            _, elements = _read_listing_page(response, selector_type, selector, strainer, timings)
+            if not elements:
+                break
+            elements_seen += len(elements)
+            if max_items is None or elements_seen < max_items:
+                top_up()
+            if cursor is not None:
+                cursor.next_page = number + 1
+                cursor.pages_visited += 1
+                cursor.elements_seen = elements_seen
+            yield page_url, elements
+    finally:
+        for _, _, future in in_flight:
+            future.cancel()
+        fetcher.shutdown(wait=False)
+
 def scrape_paginated(
     url: str,
     selector_type: str,
@@ -420,79 +1058,136 @@ def scrape_paginated(
     detail_image_attribute: str = "src",
     fast_mode: bool = False,
     progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
-    is_canceled: Optional[Callable[[], bool]] = None
+    is_canceled: Optional[Callable[[], bool]] = None,
+    pipeline: bool = True,
+    page_url_template: Optional[str] = None,
+    page_start: int = 1,
+    page_window: int = 4,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
+    checkpoint_id: Optional[str] = None,
 ) -> ScrapeResult:
+    """Scrape every page of a listing, by next link or by page URL template.
+
+    With a ``checkpoint_id`` the crawl position and the items so far are
+    saved after each page. A later call with the same id and listing
+    arguments carries on from there instead of starting at page 1; the
+    checkpoint is removed once the scrape completes. If another run is using
+    the same checkpoint, this one runs without.
+    """
     start_time = time.perf_counter()
-    session = create_session(user_agent, fast_mode=fast_mode)
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    session = create_session(user_agent, fast_mode=fast_mode, rate_limit=rate_limit, respect_robots=respect_robots)
+    timings = timings_for(session)
+    strainer = _listing_strainer(lean_parse, selector_type, selector, next_selector, detail_url_selector, detail_image_selector)
+    allowed = _robots_guard(respect_robots, user_agent)
 
-    collected: List[dict] = []
+    collected: List[ScrapeItem] = []
     pages_visited = 0
-    current_url = url
-    url_graveyard: set = set()  # Track visited URLs to avoid infinite loops
 
-    while current_url:
-        if is_canceled and is_canceled():
-            raise RuntimeError("Cancelled")
+    checkpoint: Optional[CrawlCheckpoint] = None
+    cursor: Optional[CrawlCursor] = None
+    if checkpoint_id:
+        checkpoint = open_checkpoint(checkpoint_id, crawl_fingerprint(
+            url=url, selector_type=selector_type, selector=selector, next_selector=next_selector,
+            attribute_name=attribute_name, detail_url_selector=detail_url_selector,
+            detail_url_attribute=detail_url_attribute, detail_image_selector=detail_image_selector,
+            detail_image_attribute=detail_image_attribute, page_url_template=page_url_template,
+            page_start=page_start, fields=list(fields) if fields else None,
+        ))
+        if not checkpoint.acquire():
+            # Another run of this crawl is using it
+            checkpoint = None
+        else:
+            cursor = CrawlCursor()
+    try:
+        if checkpoint is not None:
+            saved = checkpoint.load()
+            if saved is not None:
+                cursor, saved_items = saved
+                collected = [ScrapeItem(**item) for item in saved_items]
+                pages_visited = cursor.pages_visited
+                if progress_cb:
+                    progress_cb({
+                        "stage": "resumed",
+                        "pages_visited": pages_visited,
+                        "items": len(collected),
+                        "url": cursor.next_url or url,
+                    })
 
-        # Check if we've been here before (avoid infinite loops)
-        if current_url in url_graveyard:
-            break
-        url_graveyard.add(current_url)
+        if page_url_template:
+            pages = _iter_template_pages(
+                page_url_template, session, selector_type, selector,
+                page_start=page_start, page_window=page_window,
+                max_pages=max_pages, max_items=max_items, is_canceled=is_canceled, strainer=strainer, allowed=allowed,
+                cursor=cursor,
+            )
+        else:
+            # A resumed cursor with no next_url had already reached the last page
+            pages = _iter_next_link_pages(
+                cursor.next_url if cursor is not None and cursor.resumed else url,
+                session, selector_type, selector, next_selector,
+                max_pages=max_pages, max_items=max_items, is_canceled=is_canceled, pipeline=pipeline, strainer=strainer,
+                allowed=allowed, cursor=cursor,
+            )
 
-        response = _http_get(current_url, session=session)
-        html = response.text
-        soup = BeautifulSoup(html, "lxml")
+        try:
+            for current_url, elements in pages:
+                with timings.measure("items"):
+                    page_items = _elements_to_items(
+                        current_url,
+                        elements,
+                        attribute_name,
+                        detail_url_selector,
+                        detail_url_attribute,
+                        detail_image_selector,
+                        detail_image_attribute,
+                        fields=fields,
+                    )
+                for it in page_items:
+                    if is_canceled and is_canceled():
+                        raise ScrapeCancelled("Cancelled")
+                    collected.append(it)
+                if checkpoint is not None:
+                    checkpoint.save(cursor, [it.to_dict() for it in page_items])
 
-        if selector_type.lower() in {"css", "selector", "query"}:
-            elements = soup.select(selector)
-        else:
-            raise ValueError("Unknown selector_type. Use 'css'.")
-
-        page_items = _elements_to_items(
-            current_url,
-            elements,
-            attribute_name,
-            detail_url_selector,
-            detail_url_attribute,
-            detail_image_selector,
-            detail_image_attribute,
-        )
-        for it in page_items:
-            if is_canceled and is_canceled():
-                raise RuntimeError("Cancelled")
-            collected.append(it)
-
-        if progress_cb:
-            progress_cb({
-                "stage": "page",
-                "pages_visited": pages_visited,
-                "items": len(collected),
-                "url": current_url,
-            })
-
-        pages_visited += 1
-        if max_pages is not None and pages_visited >= max_pages:
-            break
-
-        if max_items is not None and len(collected) >= max_items:
-            collected = collected[:max(0, max_items)]
-            break
+                if progress_cb:
+                    progress_cb({
+                        "stage": "page",
+                        "pages_visited": pages_visited,
+                        "items": len(collected),
+                        "url": current_url,
+                    })
 
-        next_url = _find_next_url(current_url, soup, next_selector)
-        if not next_url or next_url == current_url:
-            break
-        current_url = next_url
+                pages_visited += 1
+                if max_items is not None and len(collected) >= max_items:
+                    break
+        finally:
+            pages.close()
+        if max_items is not None:
+            collected = collected[:max(0, max_items)]
 
-    # Enrich/override items with full images if requested (in parallel)
-    if detail_image_selector:
-        _enrich_items_with_detail_images(
-            session=session,
-            items=collected,
-            detail_image_selector=detail_image_selector,
-            detail_image_attribute=detail_image_attribute,
-            is_canceled=is_canceled,
-            max_workers=8
-        )
+        # Enrich/override items with full images if requested (in parallel)
+        if detail_image_selector:
+            _enrich_items_with_detail_images(
+                session=session,
+                items=collected,
+                detail_image_selector=detail_image_selector,
+                detail_image_attribute=detail_image_attribute,
+                is_canceled=is_canceled,
+                max_workers=8,
+                progress_cb=progress_cb,
+                selector_type=selector_type,
+                allowed=allowed,
+            )
+        if checkpoint is not None:
+            checkpoint.discard()
+    finally:
+        if checkpoint is not None:
+            checkpoint.release()
 
     # Reindex items
     for idx, item in enumerate(collected):
@@ -501,11 +1196,127 @@ def scrape_paginated(
     if progress_cb:
         progress_cb({"stage": "done", "items": len(collected), "url": url})
 
-    elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+    elapsed = time.perf_counter() - start_time
+    record_scrape("paginated", timings, elapsed)
     return ScrapeResult(
         url=url,
         selector=selector,
         selector_type=selector_type,
         items=collected,
-        elapsed_ms=elapsed_ms,
+        elapsed_ms=int(elapsed * 1000),
+        timings=timings.to_dict(),
     )
+
+def iter_items(
+    url: str,
+    selector_type: str,
+    selector: str,
+    next_selector: Optional[str] = None,
+    attribute_name: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    detail_url_selector: Optional[str] = None,
+    detail_url_attribute: str = "href",
+    detail_image_selector: Optional[str] = None,
+    detail_image_attribute: str = "src",
+    fast_mode: bool = False,
+    progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    pipeline: bool = True,
+    page_url_template: Optional[str] = None,
+    page_start: int = 1,
+    page_window: int = 4,
+    detail_batch_size: int = 16,
+    lean_parse: bool = False,
+    respect_robots: bool = False,
+    rate_limit: Optional[float] = None,
+    fields: Optional[Collection[str]] = None,
+    finished_cb: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> Iterator[ScrapeItem]:
+    """Yield items as each page is scraped, without holding the whole result.
+
+    Takes the same arguments as scrape_paginated (without next_selector or a
+    template it scrapes the single page at ``url``). Detail-page images are
+    filled in ``detail_batch_size`` items at a time, just before those items
+    are yielded, and ``index`` counts across pages. Once the last item is out,
+    ``finished_cb`` gets the scrape's elapsed_ms and timings, as a ScrapeResult
+    would carry them.
+    """
+    start_time = time.perf_counter()
+    _check_selector_type(selector_type)
+    fields = parse_fields(fields)
+    session = create_session(user_agent, fast_mode=fast_mode, rate_limit=rate_limit, respect_robots=respect_robots)
+    timings = timings_for(session)
+    strainer = _listing_strainer(lean_parse, selector_type, selector, next_selector, detail_url_selector, detail_image_selector)
+    allowed = _robots_guard(respect_robots, user_agent)
+    if page_url_template:
+        pages = _iter_template_pages(
+            page_url_template, session, selector_type, selector,
+            page_start=page_start, page_window=page_window,
+            max_pages=max_pages, max_items=max_items, is_canceled=is_canceled, strainer=strainer, allowed=allowed,
+        )
+    else:
+        pages = _iter_next_link_pages(
+            url, session, selector_type, selector, next_selector,
+            max_pages=max_pages, max_items=max_items, is_canceled=is_canceled, pipeline=pipeline, strainer=strainer,
+            allowed=allowed,
+        )
+
+    produced = 0
+    pages_visited = 0
+    try:
+        for current_url, elements in pages:
+            if max_items is not None:
+                # Slice early to avoid converting unnecessary elements
+                elements = elements[: max(0, max_items - produced)]
+            with timings.measure("items"):
+                page_items = _elements_to_items(
+                    current_url,
+                    elements,
+                    attribute_name,
+                    detail_url_selector,
+                    detail_url_attribute,
+                    detail_image_selector,
+                    detail_image_attribute,
+                    fields=fields,
+                )
+            for start in range(0, len(page_items), max(1, detail_batch_size)):
+                batch = page_items[start:start + max(1, detail_batch_size)]
+                if detail_image_selector:
+                    _enrich_items_with_detail_images(
+                        session=session,
+                        items=batch,
+                        detail_image_selector=detail_image_selector,
+                        detail_image_attribute=detail_image_attribute,
+                        is_canceled=is_canceled,
+                        max_workers=8,
+                        selector_type=selector_type,
+                        allowed=allowed,
+                    )
+                for item in batch:
+                    if is_canceled and is_canceled():
+                        raise ScrapeCancelled("Cancelled")
+                    item["index"] = produced
+                    produced += 1
+                    yield item
+
+            if progress_cb:
+                progress_cb({
+                    "stage": "page",
+                    "pages_visited": pages_visited,
+                    "items": produced,
+                    "url": current_url,
+                })
+            pages_visited += 1
+            if max_items is not None and produced >= max_items:
+                break
+    finally:
+        pages.close()
+
+    elapsed = time.perf_counter() - start_time
+    record_scrape("stream", timings, elapsed)
+    if progress_cb:
+        progress_cb({"stage": "done", "items": produced, "url": url})
+    if finished_cb:
+        finished_cb(int(elapsed * 1000), timings.to_dict())
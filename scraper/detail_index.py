@@ -0,0 +1,154 @@
+# scraper-webUI
+# Persistent detail page -> image URL index
+# detail_index.py
+# By G0246
+
+# Detail enrichment resolves each detail page to its full image URL. Product
+# image URLs rarely change, so the answers are kept in a single SQLite file,
+# keyed by detail URL plus the selector and attribute used to find the image.
+# The enrichers look URLs up here first and only fetch the pages they have
+# not seen (or whose entry has expired). Only found images are stored; a page
+# that yielded nothing is asked again next time.
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Collection, Dict, Iterable, Optional, Tuple
+
+# Set SCRAPER_DETAIL_INDEX=0 to turn it off
+DETAIL_INDEX_ENABLED = os.environ.get("SCRAPER_DETAIL_INDEX", "1").strip().lower() not in {"0", "false", "no", "off"}
+DETAIL_INDEX_PATH = os.environ.get("SCRAPER_DETAIL_INDEX_PATH", os.path.join(".cache", "detail_index.sqlite3"))
+DETAIL_INDEX_TTL = float(os.environ.get("SCRAPER_DETAIL_INDEX_TTL", str(7 * 24 * 3600)))
+DETAIL_INDEX_MAX_ENTRIES = int(os.environ.get("SCRAPER_DETAIL_INDEX_MAX_ENTRIES", "200000"))
+
+# Stay well under SQLite's limit on bound parameters per statement
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detail_images (
+    detail_url TEXT NOT NULL,
+    selector_key TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (detail_url, selector_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS detail_images_stored_at ON detail_images (stored_at);
+"""
+
+def _selector_key(selector: str, attribute: str, selector_type: str) -> str:
+    return "\x1f".join((selector_type or "css", selector, attribute or "src"))
+
+class DetailImageIndex:
+    """TTL + size-capped map of (detail URL, selector, attribute) -> image URL."""
+
+    def __init__(self, path: str, ttl_seconds: float = DETAIL_INDEX_TTL, max_entries: int = DETAIL_INDEX_MAX_ENTRIES) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM detail_images").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def lookup_many(self, detail_urls: Collection[str], selector: str, attribute: str, selector_type: str = "css") -> Dict[str, str]:
+        """Image URLs for the detail pages that have a live entry."""
+        key = _selector_key(selector, attribute, selector_type)
+        cutoff = time.time() - self.ttl_seconds
+        urls = list(detail_urls)
+        found: Dict[str, str] = {}
+        with self._lock:
+            try:
+                for start in range(0, len(urls), _LOOKUP_BATCH):
+                    batch = urls[start:start + _LOOKUP_BATCH]
+                    rows = self._conn.execute(
+                        "SELECT detail_url, image_url FROM detail_images "
+                        f"WHERE selector_key = ? AND stored_at >= ? AND detail_url IN ({','.join('?' * len(batch))})",
+                        [key, cutoff, *batch],
+                    ).fetchall()
+                    found.update(rows)
+            except sqlite3.Error:
+                # A locked or broken index only costs the fetches it would have saved
+                found.clear()
+            self.hits += len(found)
+            self.misses += len(urls) - len(found)
+        return found
+
+    def store_many(self, pairs: Iterable[Tuple[str, str]], selector: str, attribute: str, selector_type: str = "css") -> None:
+        key = _selector_key(selector, attribute, selector_type)
+        now = time.time()
+        rows = [(detail_url, key, image_url, now) for detail_url, image_url in pairs if image_url]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("INSERT OR REPLACE INTO detail_images VALUES (?, ?, ?, ?)", rows)
+                self.stores += len(rows)
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM detail_images").fetchone()[0]
+                self._evict(now)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, now: float) -> None:
+        if self._entries <= self.max_entries:
+            return
+        # Expired rows go first, then the oldest ones down to the cap
+        removed = self._conn.execute("DELETE FROM detail_images WHERE stored_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = self._entries - removed - self.max_entries
+        if overflow > 0:
+            removed += self._conn.execute(
+                "DELETE FROM detail_images WHERE (detail_url, selector_key) IN "
+                "(SELECT detail_url, selector_key FROM detail_images ORDER BY stored_at LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        self._entries -= removed
+        self.evictions += removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM detail_images")
+            self._entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+_detail_index: Optional[DetailImageIndex] = None
+_detail_index_lock = threading.Lock()
+
+def get_detail_index() -> Optional[DetailImageIndex]:
+    """The process-wide index, opened on first use (None when disabled)."""
+    global _detail_index
+    if not DETAIL_INDEX_ENABLED:
+        return None
+    with _detail_index_lock:
+        if _detail_index is None:
+            _detail_index = DetailImageIndex(DETAIL_INDEX_PATH)
+        return _detail_index
+
+def get_detail_index_stats() -> Dict[str, Any]:
+    index = get_detail_index()
+    return index.stats() if index is not None else {"enabled": False}
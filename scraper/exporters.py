@@ -0,0 +1,251 @@
+# scraper-webUI
+# Streaming export writers
+# exporters.py
+# By G0246
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import re
+import tempfile
+import time
+import zipfile
+import concurrent.futures
+from typing import IO, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from scraper.imagestore import ImageStore
+
+CSV_FIELDS = ["index", "tag", "text", "href", "attribute_value", "image_url", "html"]
+
+# Formats that are already compressed; deflating them again only burns CPU
+ALREADY_COMPRESSED_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif"}
+
+# Images up to this size stay in memory while queued for the ZIP, bigger ones spill to disk
+SPOOL_MAX_BYTES = 1024 * 1024
+
+class _ChunkBuffer:
+    """File-like sink for csv.writer that hands back what was written so far."""
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+
+    def write(self, text: str) -> int:
+        self._parts.append(text)
+        return len(text)
+
+    def drain(self) -> str:
+        text = "".join(self._parts)
+        self._parts.clear()
+        return text
+
+def iter_csv(items: Iterable[dict], fieldnames: Optional[List[str]] = None, rows_per_chunk: int = 200) -> Iterator[bytes]:
+    """Yield a CSV export as UTF-8 chunks, a few hundred rows at a time."""
+    buffer = _ChunkBuffer()
+    csv_wizard = csv.DictWriter(buffer, fieldnames=fieldnames or CSV_FIELDS, extrasaction="ignore")
+    csv_wizard.writeheader()
+    for count, item in enumerate(items, start=1):
+        csv_wizard.writerow(item)
+        if count % rows_per_chunk == 0:
+            yield buffer.drain().encode("utf-8")
+    tail = buffer.drain()
+    if tail:
+        yield tail.encode("utf-8")
+
+def iter_json_array(items: Iterable[dict], items_per_chunk: int = 100, fieldnames: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Yield a JSON array one element at a time.
+
+    The output matches json.dumps(list(items), ensure_ascii=False, indent=2).
+    With ``fieldnames`` each object only carries those keys.
+    """
+    parts: List[str] = []
+    count = 0
+    for item in items:
+        if fieldnames is not None:
+            row = {name: item.get(name) for name in fieldnames}
+        else:
+            # ScrapeItem is dict-like but not a dict, json wants the real thing
+            row = item if isinstance(item, dict) else dict(item.items())
+        element = json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        parts.append(("[\n  " if count == 0 else ",\n  ") + element)
+        count += 1
+        if count % items_per_chunk == 0:
+            yield "".join(parts).encode("utf-8")
+            parts.clear()
+    parts.append("\n]" if count else "[]")
+    yield "".join(parts).encode("utf-8")
+
+def iter_ndjson(items: Iterable[dict], lines_per_chunk: int = 100) -> Iterator[bytes]:
+    """Yield one compact JSON object per line, a chunk of lines at a time."""
+    parts: List[str] = []
+    for count, item in enumerate(items, start=1):
+        row = item if isinstance(item, dict) else dict(item.items())
+        parts.append(json.dumps(row, ensure_ascii=False) + "\n")
+        if count % lines_per_chunk == 0:
+            yield "".join(parts).encode("utf-8")
+            parts.clear()
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+class _ZipSink:
+    """Write-only stream for zipfile that lets the caller drain what was written.
+
+    It has no tell()/seek(), so zipfile writes data descriptors after each
+    entry instead of seeking back to patch the local headers.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self.pending = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.pending = 0
+        return data
+
+def iter_zip(entries: Iterable[Tuple[str, Iterable[bytes]]], flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield a ZIP archive while its entries are still being produced.
+
+    Each entry is (name, chunks). Entries with an already-compressed image
+    extension are stored as is, everything else is deflated.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:  # type: ignore[arg-type]
+        for name, chunks in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            stored = os.path.splitext(name)[1].lower() in ALREADY_COMPRESSED_EXTS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with zf.open(info, mode="w") as dest:
+                for chunk in chunks:
+                    dest.write(chunk)
+                    if sink.pending >= flush_bytes:
+                        yield sink.drain()
+            if sink.pending:
+                yield sink.drain()
+    # Central directory
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+def _sanitize(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)[:120]
+
+def _image_filename(idx: int, img_url: str, content_type: str) -> str:
+    parsed = urlparse(img_url)
+    base = os.path.basename(parsed.path) or f"image_{idx}"
+    root, ext = os.path.splitext(base)
+    if not ext:
+        if "png" in content_type:
+            ext = ".png"
+        elif "webp" in content_type:
+            ext = ".webp"
+        elif "avif" in content_type:
+            ext = ".avif"
+        elif "gif" in content_type:
+            ext = ".gif"
+        else:
+            ext = ".jpg"
+    return f"{idx:04d}_{_sanitize(root)}{ext}"
+
+def _download_to_spool(session: requests.Session, idx: int, img_url: str) -> Tuple[int, Optional[str], Optional[str], Optional[IO[bytes]]]:
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        with session.get(img_url, timeout=20, stream=True) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                spool.write(chunk)
+            filename = _image_filename(idx, img_url, resp.headers.get("Content-Type", ""))
+        spool.seek(0)
+        return idx, filename, None, spool
+    except Exception:
+        spool.close()
+        return idx, None, None, None
+
+def _open_image(session: requests.Session, store: Optional[ImageStore], idx: int, img_url: str) -> Tuple[int, Optional[str], Optional[str], Optional[IO[bytes]]]:
+    """(idx, filename, content digest, open file); the digest is only known for stored images."""
+    if store is None:
+        return _download_to_spool(session, idx, img_url)
+    try:
+        stored, fh = store.open(session, img_url)
+    except Exception:
+        return idx, None, None, None
+    return idx, _image_filename(idx, img_url, stored.content_type), stored.digest, fh
+
+def _close_opened(future: concurrent.futures.Future) -> None:
+    # Done callback for downloads nobody will read any more
+    if future.cancelled() or future.exception() is not None:
+        return
+    spool = future.result()[3]
+    if spool is not None:
+        spool.close()
+
+def _read_spool(spool: IO[bytes]) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = spool.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        spool.close()
+
+def iter_image_zip(
+    session: requests.Session,
+    image_urls: Iterable[str],
+    max_workers: int = 8,
+    store: Optional[ImageStore] = None,
+) -> Iterator[bytes]:
+    """Download images concurrently and stream them out as a ZIP.
+
+    At most ``max_workers`` downloads are in flight and entries are written
+    in the order they finish. With a ``store`` images come from (and go to)
+    the image store, and an image whose bytes are already in the archive
+    under another URL is left out. Without one each download is buffered in
+    a spooled temp file. Failed downloads are skipped.
+    """
+    def finished_entries() -> Iterator[Tuple[str, Iterable[bytes]]]:
+        todo = iter(enumerate(image_urls))
+        in_flight: Set[concurrent.futures.Future] = set()
+        ready: List[concurrent.futures.Future] = []
+        written: Set[str] = set()
+        ex = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while True:
+                for idx, img_url in todo:
+                    in_flight.add(ex.submit(_open_image, session, store, idx, img_url))
+                    if len(in_flight) >= max_workers:
+                        break
+                if not in_flight:
+                    return
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                ready.extend(done)
+                while ready:
+                    _, filename, digest, spool = ready.pop().result()
+                    if spool is None or not filename:
+                        continue
+                    if digest is not None:
+                        if digest in written:
+                            spool.close()
+                            continue
+                        written.add(digest)
+                    yield filename, _read_spool(spool)
+        finally:
+            # Client went away mid-download: don't wait on running downloads, close their files as they finish
+            for future in list(in_flight) + ready:
+                future.add_done_callback(_close_opened)
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    return iter_zip(finished_entries())
@@ -3,12 +3,25 @@
 # gen_UA.py
 # By G0246
 
+# The choice tables (versions, platforms, weighted generators) are built once
+# per generator, so a fresh UA is a few random picks and one string format.
+# Sessions without an explicit UA rotate it on every request; they take the
+# next entry of a ring of pre-generated UAs, which costs one step of an
+# iterator and hands back a string that already exists. Set
+# SCRAPER_UA_RING_SIZE=0 to generate a fresh UA per request instead.
+
 from __future__ import annotations
 
+import bisect
+import itertools
+import os
 import random
-from typing import List, Tuple, Optional
+import threading
+from typing import Any, Callable, Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+UA_RING_SIZE = int(os.environ.get("SCRAPER_UA_RING_SIZE", "512"))
+
 @dataclass
 class BrowserVersion:
     """Holds version information for browsers"""
@@ -82,15 +95,48 @@ class UserAgentGenerator:
         "606.2.11",
     ]
 
+    def __init__(self) -> None:
+        # Generator tables: (generators, cumulative weights, total weight)
+        self._desktop = self._weighted_table([
+            # Weight Chrome and Firefox more heavily (more common)
+            (self._generate_chrome_windows, 20),
+            (self._generate_chrome_macos, 15),
+            (self._generate_chrome_linux, 10),
+            (self._generate_firefox_windows, 15),
+            (self._generate_firefox_macos, 10),
+            (self._generate_firefox_linux, 8),
+            (self._generate_safari_macos, 12),
+            (self._generate_edge_windows, 10),
+        ])
+        self._mobile = self._weighted_table([
+            # Weight Chrome Android and iOS Safari more heavily
+            (self._generate_chrome_android, 40),
+            (self._generate_safari_ios, 35),
+            (self._generate_safari_ipad, 15),
+            (self._generate_firefox_android, 10),
+        ])
+        self._android_versions = tuple(version for version, _ in self.ANDROID_DEVICES)
+
+    @staticmethod
+    def _weighted_table(entries: List[Tuple[Callable[[], str], int]]) -> Tuple[Tuple[Callable[[], str], ...], Tuple[int, ...], int]:
+        generators = tuple(generator for generator, _ in entries)
+        cumulative = tuple(itertools.accumulate(weight for _, weight in entries))
+        return generators, cumulative, cumulative[-1]
+
+    @staticmethod
+    def _pick(table: Tuple[Tuple[Callable[[], str], ...], Tuple[int, ...], int]) -> str:
+        generators, cumulative, total = table
+        return generators[bisect.bisect(cumulative, random.random() * total)]()
+
     def _random_chrome_version(self) -> str:
-        major = random.choice(list(self.CHROME_VERSIONS))
+        major = random.choice(self.CHROME_VERSIONS)
         minor = 0
         patch = random.randint(0, 5000)
         build = random.randint(0, 200)
         return f"{major}.{minor}.{patch}.{build}"
 
     def _random_firefox_version(self) -> str:
-        major = random.choice(list(self.FIREFOX_VERSIONS))
+        major = random.choice(self.FIREFOX_VERSIONS)
         return f"{major}.0"
 
     def _random_safari_version(self) -> Tuple[str, str]:
@@ -159,7 +205,7 @@ class UserAgentGenerator:
         )
 
     def _generate_edge_windows(self) -> str:
-        edge_major = random.choice(list(self.EDGE_VERSIONS))
+        edge_major = random.choice(self.EDGE_VERSIONS)
         edge_version = f"{edge_major}.0.{random.randint(2000, 3000)}.{random.randint(0, 100)}"
         chrome_version = self._random_chrome_version()
         windows = random.choice(self.WINDOWS_VERSIONS)
@@ -197,7 +243,7 @@ class UserAgentGenerator:
         )
 
     def _generate_firefox_android(self) -> str:
-        android_version = random.choice([v[0] for v in self.ANDROID_DEVICES])
+        android_version = random.choice(self._android_versions)
         firefox_version = self._random_firefox_version()
         return (
             f"Mozilla/5.0 (Android {android_version}; Mobile; rv:{firefox_version}) "
@@ -205,32 +251,10 @@ class UserAgentGenerator:
         )
 
     def generate_desktop(self) -> str:
-        generators = [
-            self._generate_chrome_windows,
-            self._generate_chrome_macos,
-            self._generate_chrome_linux,
-            self._generate_firefox_windows,
-            self._generate_firefox_macos,
-            self._generate_firefox_linux,
-            self._generate_safari_macos,
-            self._generate_edge_windows,
-        ]
-        # Weight Chrome and Firefox more heavily (more common)
-        weights = [20, 15, 10, 15, 10, 8, 12, 10]
-        chosen_generator = random.choices(generators, weights=weights, k=1)[0]
-        return chosen_generator()
+        return self._pick(self._desktop)
 
     def generate_mobile(self) -> str:
-        generators = [
-            self._generate_chrome_android,
-            self._generate_safari_ios,
-            self._generate_safari_ipad,
-            self._generate_firefox_android,
-        ]
-        # Weight Chrome Android and iOS Safari more heavily
-        weights = [40, 35, 15, 10]
-        chosen_generator = random.choices(generators, weights=weights, k=1)[0]
-        return chosen_generator()
+        return self._pick(self._mobile)
 
     def generate(self, prefer_mobile: bool = False) -> str:
         if prefer_mobile:
@@ -244,8 +268,71 @@ class UserAgentGenerator:
             return self.generate_desktop()
 
 
+def is_mobile_user_agent(user_agent: str) -> bool:
+    return "Mobile" in user_agent or "Android" in user_agent
+
+class UserAgentRing:
+    """``size`` pre-generated UAs handed out round-robin.
+
+    ``next()`` returns ``(user_agent, is_mobile)``; the pairs are built up front
+    so a rotation allocates nothing.
+    """
+
+    def __init__(self, generator: UserAgentGenerator, size: int, prefer_mobile: bool = False) -> None:
+        agents = (generator.generate(prefer_mobile) for _ in range(max(1, size)))
+        self.agents: Tuple[Tuple[str, bool], ...] = tuple((agent, is_mobile_user_agent(agent)) for agent in agents)
+        # itertools.cycle steps in C, so concurrent callers cannot tear it
+        self.next: Callable[[], Tuple[str, bool]] = itertools.cycle(self.agents).__next__
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
 # Global generator instance (singleton pattern)
 _generator = UserAgentGenerator()
+_rings: Dict[bool, UserAgentRing] = {}
+_rings_lock = threading.Lock()
+
+def get_user_agent_ring(prefer_mobile: bool = False) -> Optional[UserAgentRing]:
+    """The shared ring for this desktop/mobile mix, built on first use (None when disabled)."""
+    if UA_RING_SIZE <= 0:
+        return None
+    ring = _rings.get(prefer_mobile)
+    if ring is None:
+        with _rings_lock:
+            ring = _rings.get(prefer_mobile)
+            if ring is None:
+                ring = UserAgentRing(_generator, UA_RING_SIZE, prefer_mobile)
+                _rings[prefer_mobile] = ring
+    return ring
+
+def user_agent_rotation(prefer_mobile: bool = False) -> Callable[[], Tuple[str, bool]]:
+    """Callable giving ``(user_agent, is_mobile)`` for each request of a session."""
+    ring = get_user_agent_ring(prefer_mobile)
+    if ring is not None:
+        return ring.next
+
+    def fresh() -> Tuple[str, bool]:
+        agent = _generator.generate(prefer_mobile)
+        return agent, is_mobile_user_agent(agent)
+    return fresh
+
+def get_user_agent_ring_stats() -> Dict[str, Any]:
+    if UA_RING_SIZE <= 0:
+        return {"enabled": False}
+    with _rings_lock:
+        rings = dict(_rings)
+    return {
+        "enabled": True,
+        "size": UA_RING_SIZE,
+        "rings": {
+            ("mobile" if prefer_mobile else "desktop"): {
+                "agents": len(ring),
+                "unique": len(set(agent for agent, _ in ring.agents)),
+                "mobile": sum(1 for _, mobile in ring.agents if mobile),
+            }
+            for prefer_mobile, ring in rings.items()
+        },
+    }
 
 
 def get_random_user_agent(prefer_mobile: bool = False) -> str:
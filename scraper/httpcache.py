@@ -0,0 +1,277 @@
+# scraper-webUI
+# On-disk HTTP cache with conditional GET
+# httpcache.py
+# By G0246
+
+# Sits under the shared session adapter (see scraper.client). Text responses
+# are stored on disk with their validators. While Cache-Control max-age says a
+# page is fresh it is served straight from disk; after that the request goes
+# out with If-None-Match / If-Modified-Since and a 304 is answered from disk,
+# so re-running a preset against an unchanged site only costs the 304s.
+#
+# There is one entry per URL. A response with a Vary header keeps the values
+# the request had for those headers, and the entry only answers requests with
+# the same values (a page stored for a mobile User-Agent is not served to a
+# desktop one).
+
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Bodies we keep: pages, not images or archives
+_CACHEABLE_TYPES = re.compile(r"^(text/|application/(xhtml\+xml|xml|json|ld\+json|rss\+xml|atom\+xml))", re.I)
+# Not meaningful once the body has been decoded and stored
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+def _cache_directives(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+def _max_age(headers: Dict[str, str]) -> Optional[float]:
+    raw = _cache_directives(headers.get("Cache-Control")).get("max-age")
+    try:
+        return max(0.0, float(raw)) if raw is not None else None
+    except ValueError:
+        return None
+
+class DiskCache:
+    """Size-capped LRU store of HTTP responses, one file per URL.
+
+    Each file is a JSON metadata line followed by the raw body. Recency is
+    tracked in memory and mirrored in file mtimes, so the LRU order survives
+    a restart.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, max_bytes)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".entry"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-len(".entry")], st.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".entry")
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def load(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        key = self.key_for(url)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                meta = json.loads(fh.readline().decode("utf-8"))
+                body = fh.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self._forget(key)
+            return None
+        if meta.get("url") != url:
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return meta, body
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes, vary: Optional[Dict[str, str]] = None) -> None:
+        key = self.key_for(url)
+        meta = {"url": url, "status": status, "headers": headers, "stored_at": time.time(), "vary": vary or {}}
+        blob = json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n" + body
+        if self.max_bytes and len(blob) > self.max_bytes:
+            return
+        # Write then rename, so a reader never sees half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(blob)
+            self._total_bytes += len(blob)
+            self.stores += 1
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        self._total_bytes -= self._index.pop(key, 0)
+
+    def _evict(self) -> None:
+        while self.max_bytes and self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._index)
+            self._index.clear()
+            self._total_bytes = 0
+        for key in keys:
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+class StoringStream:
+    """Stands in for a streamed response's raw body and stores it once fully read.
+
+    A reader that stops early (see the detail page extractor) never gets to
+    the end, so a partial body is never cached.
+    """
+
+    def __init__(self, raw: Any, on_complete: Callable[[bytes], None]) -> None:
+        self._raw = raw
+        self._on_complete = on_complete
+
+    def stream(self, amt: int = 2 ** 16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        chunks = []
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            chunks.append(chunk)
+            yield chunk
+        self._on_complete(b"".join(chunks))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+def is_fresh(meta: Dict[str, Any], now: Optional[float] = None) -> bool:
+    headers = meta.get("headers") or {}
+    directives = _cache_directives(headers.get("Cache-Control"))
+    if "no-cache" in directives:
+        return False
+    max_age = _max_age(headers)
+    if max_age is None:
+        return False
+    return (now or time.time()) - float(meta.get("stored_at", 0)) < max_age
+
+def vary_values(response_headers: Any, request_headers: Any) -> Dict[str, str]:
+    """The request's values for the headers the response Varies on."""
+    names = (name.strip().lower() for name in response_headers.get("Vary", "").split(","))
+    return {name: request_headers.get(name, "") for name in names if name}
+
+def vary_matches(meta: Dict[str, Any], request_headers: Any) -> bool:
+    return all(request_headers.get(name, "") == value for name, value in (meta.get("vary") or {}).items())
+
+def validators(meta: Dict[str, Any]) -> Dict[str, str]:
+    headers = meta.get("headers") or {}
+    conditional: Dict[str, str] = {}
+    if headers.get("ETag"):
+        conditional["If-None-Match"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        conditional["If-Modified-Since"] = headers["Last-Modified"]
+    return conditional
+
+def is_storable(response: requests.Response) -> bool:
+    if response.status_code != 200:
+        return False
+    if not _CACHEABLE_TYPES.match(response.headers.get("Content-Type", "")):
+        return False
+    if response.headers.get("Vary", "").strip() == "*":
+        return False
+    directives = _cache_directives(response.headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return False
+    # Without a validator or a lifetime the stored copy could never be reused
+    return bool(response.headers.get("ETag") or response.headers.get("Last-Modified") or _max_age(response.headers))
+
+def storable_headers(headers: Any) -> Dict[str, str]:
+    kept = {name: value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS}
+    kept.setdefault("Date", email.utils.formatdate(usegmt=True))
+    return kept
+
+def merge_304_headers(stored: Dict[str, str], fresh: Any) -> Dict[str, str]:
+    """A 304 carries updated Cache-Control/ETag/Date; the rest stays as stored."""
+    merged = CaseInsensitiveDict(stored)
+    for name, value in fresh.items():
+        if name.lower() not in _DROPPED_HEADERS:
+            merged[name] = value
+    return dict(merged.items())
+
+def response_from_cache(request: requests.PreparedRequest, meta: Dict[str, Any], body: bytes, connection: Any) -> requests.Response:
+    response = requests.Response()
+    response.status_code = int(meta.get("status", 200))
+    response.reason = "OK"
+    response.headers = CaseInsensitiveDict(meta.get("headers") or {})
+    response.headers["Content-Length"] = str(len(body))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url or meta.get("url", "")
+    response.request = request
+    response.connection = connection
+    response.raw = io.BytesIO(body)
+    response._content = body
+    response._content_consumed = True
+    response.from_cache = True  # type: ignore[attr-defined]
+    return response
@@ -0,0 +1,212 @@
+# scraper-webUI
+# Content-addressed image store
+# imagestore.py
+# By G0246
+
+# Downloaded images are kept on disk under the SHA-256 of their bytes, with a
+# small SQLite index mapping image URL -> digest. Identical images behind
+# different URLs share one file, and a repeat download of the same gallery is
+# answered from disk without any network I/O. The store is capped by total
+# bytes; the least recently used images are evicted first.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Optional, Tuple
+
+import requests
+
+# Set SCRAPER_IMAGE_STORE=0 to turn it off
+IMAGE_STORE_ENABLED = os.environ.get("SCRAPER_IMAGE_STORE", "1").strip().lower() not in {"0", "false", "no", "off"}
+IMAGE_STORE_DIR = os.environ.get("SCRAPER_IMAGE_STORE_DIR", os.path.join(".cache", "images"))
+IMAGE_STORE_MAX_BYTES = int(os.environ.get("SCRAPER_IMAGE_STORE_MAX_MB", "1024")) * 1024 * 1024
+# How long a URL -> image mapping is trusted before the image is fetched again
+IMAGE_STORE_TTL = float(os.environ.get("SCRAPER_IMAGE_STORE_TTL", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest);
+"""
+
+@dataclass(frozen=True)
+class StoredImage:
+    url: str
+    digest: str
+    path: str
+    content_type: str
+    size: int
+
+class ImageStore:
+    """Size-capped LRU store of image files, deduplicated by content hash."""
+
+    def __init__(self, directory: str, max_bytes: int = IMAGE_STORE_MAX_BYTES, ttl_seconds: float = IMAGE_STORE_TTL) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.deduplicated = 0
+        self.evictions = 0
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[StoredImage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT urls.digest, urls.content_type, urls.stored_at, blobs.size FROM urls "
+                "JOIN blobs ON blobs.digest = urls.digest WHERE urls.url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            digest, content_type, stored_at, size = row
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                # Removed behind our back
+                self._forget_blob(digest, size)
+                return None
+            if stored_at < time.time() - self.ttl_seconds:
+                self._conn.execute("DELETE FROM urls WHERE url = ?", (url,))
+                return None
+            self._conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            return StoredImage(url, digest, path, content_type, size)
+
+    def _download(self, session: requests.Session, url: str, timeout: float) -> StoredImage:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as fh, session.get(url, timeout=timeout, stream=True) as resp:
+                resp.raise_for_status()
+                content_type = resp.headers.get("Content-Type", "application/octet-stream")
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    fh.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        digest = hasher.hexdigest()
+        path = self._blob_path(digest)
+        now = time.time()
+        with self._lock:
+            if os.path.exists(path):
+                # Same bytes already stored under another URL
+                os.unlink(tmp_path)
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                self._total_bytes += size
+                self.stores += 1
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (digest, size, now))
+                self._conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)", (url, digest, content_type, now))
+            self._evict(keep=digest)
+        return StoredImage(url, digest, path, content_type, size)
+
+    def fetch(self, session: requests.Session, url: str, timeout: float = 20) -> StoredImage:
+        """The stored image for ``url``, downloading it first if needed."""
+        stored = self.lookup(url)
+        if stored is not None:
+            with self._lock:
+                self.hits += 1
+            return stored
+        with self._lock:
+            self.misses += 1
+        return self._download(session, url, timeout)
+
+    def open(self, session: requests.Session, url: str, timeout: float = 20) -> Tuple[StoredImage, IO[bytes]]:
+        """Like fetch(), plus an open handle that outlives a concurrent eviction."""
+        stored = self.fetch(session, url, timeout)
+        try:
+            return stored, open(stored.path, "rb")
+        except FileNotFoundError:
+            # Evicted between fetch and open, go around once more
+            stored = self._download(session, url, timeout)
+            return stored, open(stored.path, "rb")
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT digest, size FROM blobs ORDER BY last_used").fetchall()
+        for digest, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.unlink(self._blob_path(digest))
+            except OSError:
+                pass
+            self._forget_blob(digest, size)
+            self.evictions += 1
+
+    def _forget_blob(self, digest: str, size: int) -> None:
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self._total_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            urls, blobs = self._conn.execute("SELECT (SELECT COUNT(*) FROM urls), (SELECT COUNT(*) FROM blobs)").fetchone()
+            return {
+                "directory": self.directory,
+                "urls": urls,
+                "images": blobs,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "deduplicated": self.deduplicated,
+                "evictions": self.evictions,
+            }
+
+_image_store: Optional[ImageStore] = None
+_image_store_lock = threading.Lock()
+
+def get_image_store() -> Optional[ImageStore]:
+    """The process-wide image store, created on first use (None when disabled)."""
+    global _image_store
+    if not IMAGE_STORE_ENABLED:
+        return None
+    with _image_store_lock:
+        if _image_store is None:
+            _image_store = ImageStore(IMAGE_STORE_DIR)
+        return _image_store
+
+def get_image_store_stats() -> Dict[str, Any]:
+    store = get_image_store()
+    return store.stats() if store is not None else {"enabled": False}
@@ -0,0 +1,153 @@
+# scraper-webUI
+# Background scrape jobs
+# jobs.py
+# By G0246
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+import concurrent.futures
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from scraper.core import ScrapeCancelled
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELED = "canceled"
+
+FINISHED_STATES = {JOB_DONE, JOB_FAILED, JOB_CANCELED}
+
+# A job target gets (is_canceled, progress_cb) and returns whatever the job produces
+JobTarget = Callable[[Callable[[], bool], Callable[[Dict[str, Any]], None]], Any]
+
+@dataclass
+class Job:
+    id: str
+    params: Dict[str, Any]
+    status: str = JOB_QUEUED
+    events: List[dict] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    changed: threading.Condition = field(default_factory=threading.Condition)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def is_canceled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.changed:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "events": len(self.events),
+                "last_event": self.events[-1] if self.events else None,
+                "error": self.error,
+                "cancel_requested": self.cancel_event.is_set(),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+class JobManager:
+    """Runs scrapes on a small worker pool so request threads return right away.
+
+    Jobs report progress through ``progress_cb`` events that can be polled or
+    waited on, and are canceled cooperatively through their ``is_canceled`` flag.
+    Finished jobs are kept around (up to ``max_finished_jobs``) so clients can
+    still fetch their outcome.
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished_jobs: int = 200) -> None:
+        self.max_finished_jobs = max(1, max_finished_jobs)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scrape-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, target: JobTarget, params: Optional[Dict[str, Any]] = None) -> Job:
+        job = Job(id=secrets.token_urlsafe(9), params=dict(params or {}))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, target)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job.changed:
+            # A queued job never starts, a running one stops at its next checkpoint
+            if job.status == JOB_QUEUED:
+                self._finish(job, JOB_CANCELED)
+            job.changed.notify_all()
+        return job
+
+    def wait_for_events(self, job: Job, since: int, timeout: float = 15.0) -> Tuple[List[dict], bool]:
+        """Block until the job has events past ``since`` or finishes, then return them."""
+        with job.changed:
+            if len(job.events) <= since and not job.finished:
+                job.changed.wait(timeout)
+            return job.events[since:], job.finished
+
+    def _run(self, job: Job, target: JobTarget) -> None:
+        with job.changed:
+            if job.finished:
+                return
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            job.changed.notify_all()
+
+        def progress_cb(event: Dict[str, Any]) -> None:
+            with job.changed:
+                job.events.append(event)
+                job.changed.notify_all()
+
+        try:
+            outcome = target(job.is_canceled, progress_cb)
+        except ScrapeCancelled:
+            with job.changed:
+                self._finish(job, JOB_CANCELED)
+        except Exception as exc:
+            with job.changed:
+                job.error = str(exc)
+                self._finish(job, JOB_FAILED)
+        else:
+            with job.changed:
+                job.result = outcome
+                self._finish(job, JOB_CANCELED if job.is_canceled() else JOB_DONE)
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Caller holds job.changed
+        job.status = status
+        job.finished_at = time.time()
+        job.changed.notify_all()
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        for jid in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[jid]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"jobs": len(self._jobs), "by_status": counts}
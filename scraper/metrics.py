@@ -0,0 +1,215 @@
+# scraper-webUI
+# Scrape timings and Prometheus metrics
+# metrics.py
+# By G0246
+
+# Two levels. A ScrapeTimings rides on the session of one scrape and adds up
+# where its time went: waiting for response headers (connect, TLS and server
+# time), reading bodies, parsing, running the selector, building items and
+# the detail enrichment, plus bytes, pages, retries and cache hits. It ends
+# up on ScrapeResult.timings. When a scrape finishes its totals also go into
+# process-wide histograms and counters, which /metrics renders in the
+# Prometheus text format.
+#
+# Stage times are summed over every thread of the scrape, so with parallel
+# detail fetches "fetch" can be larger than the wall time.
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+class ScrapeTimings:
+    """Stage durations and counters for one scrape, safe to update from its worker threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.pages = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def count_response(self, fetch_seconds: float, download_seconds: float, size: int, retries: int, from_cache: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.stages["fetch"] = self.stages.get("fetch", 0.0) + fetch_seconds
+            self.stages["download"] = self.stages.get("download", 0.0) + download_seconds
+            self.bytes_downloaded += size
+            self.retries += retries
+            self.cache_hits += 1 if from_cache else 0
+
+    def count_bytes(self, size: int) -> None:
+        with self._lock:
+            self.bytes_downloaded += size
+
+    def count_page(self) -> None:
+        with self._lock:
+            self.pages += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+                "requests": self.requests,
+                "bytes_downloaded": self.bytes_downloaded,
+                "pages": self.pages,
+                "retries": self.retries,
+                "cache_hits": self.cache_hits,
+            }
+
+def timings_for(session: Any) -> ScrapeTimings:
+    """The session's timings, or a throwaway one for sessions that carry none."""
+    timings = getattr(session, "timings", None)
+    return timings if timings is not None else ScrapeTimings()
+
+# Seconds, from a cached page to a long paginated crawl
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values)
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][slot] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total[0]) for labels, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+SCRAPE_DURATION = REGISTRY.histogram("scraper_scrape_duration_seconds", "Wall time of a whole scrape.")
+STAGE_DURATION = REGISTRY.histogram("scraper_stage_duration_seconds", "Time per scrape spent in each stage, summed over its threads.")
+HTTP_REQUEST_DURATION = REGISTRY.histogram("scraper_http_request_duration_seconds", "Time from sending a request to its response headers.")
+SCRAPES = REGISTRY.counter("scraper_scrapes_total", "Scrapes completed, by kind.")
+HTTP_REQUESTS = REGISTRY.counter("scraper_http_requests_total", "HTTP requests sent, by where the response came from.")
+HTTP_RETRIES = REGISTRY.counter("scraper_http_retries_total", "Retries made by the HTTP client.")
+BYTES_DOWNLOADED = REGISTRY.counter("scraper_downloaded_bytes_total", "Response body bytes read by scrapes.")
+PAGES = REGISTRY.counter("scraper_pages_total", "Listing pages scraped.")
+
+def observe_request(seconds: float, retries: int, from_cache: bool) -> None:
+    """Count one HTTP request in the process-wide metrics."""
+    source = "cache" if from_cache else "network"
+    HTTP_REQUEST_DURATION.observe(seconds, source=source)
+    HTTP_REQUESTS.inc(source=source)
+    if retries:
+        HTTP_RETRIES.inc(retries)
+
+def record_scrape(kind: str, timings: ScrapeTimings, seconds: float) -> None:
+    """Fold a finished scrape into the process-wide metrics."""
+    SCRAPE_DURATION.observe(seconds, kind=kind)
+    SCRAPES.inc(kind=kind)
+    with timings._lock:
+        stages = dict(timings.stages)
+        pages = timings.pages
+        size = timings.bytes_downloaded
+    for stage, stage_seconds in stages.items():
+        STAGE_DURATION.observe(stage_seconds, stage=stage)
+    if pages:
+        PAGES.inc(pages)
+    if size:
+        BYTES_DOWNLOADED.inc(size)
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,213 @@
+# scraper-webUI
+# Per-host request pacing
+# politeness.py
+# By G0246
+
+# Every outbound request takes a token from its host's bucket first (see
+# PooledSession.send in scraper.client). The bucket rate is the smallest of:
+# the default or per-host rate, the per-scrape rate (presets), and the
+# robots.txt Crawl-delay when robots are respected. A 429/503 pauses the host
+# for its Retry-After and halves the rate, which then creeps back up as
+# requests succeed.
+#
+# Buckets are kept per host in LRU order. Past HOST_BUCKETS_MAX_ENTRIES hosts
+# the least recently used idle ones are dropped: refilled, not paused, and
+# either without a penalty or unused for MAX_RETRY_AFTER seconds. A fresh
+# bucket for such a host behaves the same.
+
+from __future__ import annotations
+
+import email.utils
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+def _parse_host_rates(value: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for part in value.split(","):
+        host, _, rate = part.strip().partition("=")
+        if host and rate:
+            try:
+                rates[host.strip().lower()] = float(rate)
+            except ValueError:
+                continue
+    return rates
+
+# Requests per second per host; 0 means unlimited
+DEFAULT_HOST_RATE = float(os.environ.get("SCRAPER_HOST_RATE", "20"))
+DEFAULT_HOST_BURST = int(os.environ.get("SCRAPER_HOST_BURST", "8"))
+# e.g. "books.toscrape.com=5,example.com=1"
+HOST_RATES = _parse_host_rates(os.environ.get("SCRAPER_HOST_RATES", ""))
+# Hosts kept before idle buckets are dropped
+HOST_BUCKETS_MAX_ENTRIES = int(os.environ.get("SCRAPER_HOST_BUCKETS_MAX_ENTRIES", "1024"))
+# Longest pause a single Retry-After can impose
+MAX_RETRY_AFTER = 300.0
+THROTTLE_STATUSES = {429, 503}
+
+def host_key(url: str) -> str:
+    return (urlparse(url).netloc or "").lower()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+class _HostBucket:
+    """Token bucket that hands out reservations: callers sleep outside the lock."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.penalty = 1.0  # Multiplier below 1 after the host pushed back
+        self.crawl_delay: Optional[float] = None  # Last one seen, for stats
+        self.requests = 0
+        self.waited = 0.0
+        self.throttled = 0
+        self.full_at = 0.0  # When the last reservation has been paid back
+        self.lock = threading.Lock()
+
+    def effective_rate(self, rate_cap: Optional[float], crawl_delay: Optional[float]) -> float:
+        rate = self.rate if self.rate > 0 else math.inf
+        if rate_cap and rate_cap > 0:
+            rate = min(rate, rate_cap)
+        if crawl_delay:
+            rate = min(rate, 1.0 / crawl_delay)
+        if math.isinf(rate):
+            return rate
+        return rate * self.penalty
+
+    def reserve(self, rate_cap: Optional[float] = None, crawl_delay: Optional[float] = None) -> float:
+        with self.lock:
+            now = time.monotonic()
+            if crawl_delay is not None:
+                self.crawl_delay = crawl_delay
+            rate = self.effective_rate(rate_cap, crawl_delay)
+            # Crawl-delay means one request per delay, no bursts
+            burst = 1 if crawl_delay else self.burst
+            wait = 0.0
+            if not math.isinf(rate):
+                self.tokens = min(float(burst), self.tokens + (now - self.updated) * rate)
+                self.tokens -= 1.0
+                if self.tokens < 0:
+                    wait = -self.tokens / rate
+                self.full_at = now + (burst - self.tokens) / rate
+            self.updated = now
+            wait = max(wait, self.paused_until - now)
+            self.requests += 1
+            self.waited += wait
+            return wait
+
+    def throttle(self, retry_after: Optional[float]) -> None:
+        with self.lock:
+            self.throttled += 1
+            self.penalty = max(0.05, self.penalty * 0.5)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, MAX_RETRY_AFTER))
+
+    def recover(self) -> None:
+        with self.lock:
+            if self.penalty < 1.0:
+                self.penalty = min(1.0, self.penalty * 1.1)
+
+    def idle(self, now: float) -> bool:
+        """True when a new bucket for the host would behave the same."""
+        with self.lock:
+            if now < max(self.full_at, self.paused_until):
+                return False
+            # A penalty is forgotten once the host has been left alone long enough
+            return self.penalty >= 1.0 or now - self.updated > MAX_RETRY_AFTER
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "rate": self.rate if self.rate > 0 else None,
+                "penalty": round(self.penalty, 3),
+                "crawl_delay": self.crawl_delay,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3),
+                "requests": self.requests,
+                "waited_seconds": round(self.waited, 3),
+                "throttled": self.throttled,
+            }
+
+class HostScheduler:
+    def __init__(
+        self,
+        default_rate: float = DEFAULT_HOST_RATE,
+        burst: int = DEFAULT_HOST_BURST,
+        host_rates: Optional[Dict[str, float]] = None,
+        max_entries: int = HOST_BUCKETS_MAX_ENTRIES,
+    ) -> None:
+        self.default_rate = default_rate
+        self.burst = burst
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.max_entries = max(1, max_entries)
+        self._buckets: "OrderedDict[str, _HostBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> _HostBucket:
+        host = host_key(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is not None:
+                self._buckets.move_to_end(host)
+                return bucket
+            hostname = host.split(":")[0]
+            rate = self.host_rates.get(host, self.host_rates.get(hostname, self.default_rate))
+            bucket = _HostBucket(rate, self.burst)
+            self._buckets[host] = bucket
+            if len(self._buckets) > self.max_entries:
+                self._evict_idle(keep=host)
+            return bucket
+
+    def _evict_idle(self, keep: str) -> None:
+        # Caller holds the lock. Busy or penalized hosts stay, even past the cap
+        now = time.monotonic()
+        excess = len(self._buckets) - self.max_entries
+        idle = [host for host, bucket in self._buckets.items() if host != keep and bucket.idle(now)]
+        for host in idle[:excess]:
+            del self._buckets[host]
+
+    def reserve(self, url: str, rate_cap: Optional[float] = None, crawl_delay: Optional[float] = None) -> float:
+        """Take a slot for ``url`` and return how long to wait before sending."""
+        return self.bucket(url).reserve(rate_cap, crawl_delay)
+
+    def acquire(self, url: str, rate_cap: Optional[float] = None, crawl_delay: Optional[float] = None) -> None:
+        wait = self.reserve(url, rate_cap, crawl_delay)
+        if wait > 0:
+            time.sleep(wait)
+
+    def observe(self, url: str, status: int, retry_after: Optional[str] = None) -> None:
+        """Feed a response back: 429/503 slow the host down, anything else lets it recover."""
+        bucket = self.bucket(url)
+        if status in THROTTLE_STATUSES:
+            bucket.throttle(parse_retry_after(retry_after))
+        elif status < 400:
+            bucket.recover()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {
+            "default_rate": self.default_rate if self.default_rate > 0 else None,
+            "burst": self.burst,
+            "hosts": {host: bucket.stats() for host, bucket in buckets},
+        }
+
+_scheduler = HostScheduler()
+
+def get_scheduler() -> HostScheduler:
+    return _scheduler
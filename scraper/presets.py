@@ -2,11 +2,32 @@
 # presets.py
 # By G0246
 
+# presets.json stays the file people read and edit, but the app no longer
+# rewrites it on every save. Each process keeps the presets in a dict keyed by
+# id and only reloads when presets.json or its journal changes (mtime and
+# size). A save or delete appends one line to presets.json.journal under an
+# exclusive lock on presets.json.lock, which other workers pick up by reading
+# just the lines they have not seen. Once the journal holds more entries than
+# there are presets, it is folded back into presets.json.
+#
+# The journal starts with the mtime and size of the presets.json it was
+# started against. If presets.json has been edited by hand since, the journal
+# is still replayed on top of it by id (a save of a preset overrides the hand
+# edit of that preset, other hand edits stay), and the next save folds the
+# result into presets.json.
+
 from __future__ import annotations
 
 import json
 import os
-from typing import List, Dict
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, threads are still serialized
+    fcntl = None  # type: ignore[assignment]
 
 PRESET_FIELDS = [
     "id",
@@ -23,8 +44,12 @@ PRESET_FIELDS = [
     "detail_url_attribute",
     "detail_image_selector",
     "detail_image_attribute",
+    "rate_limit",
 ]
 
+# Journal entries allowed before folding, at least this many
+MIN_JOURNAL_ENTRIES = 32
+
 # Ensure all fields are strings and strip whitespace.
 def _normalize_preset(obj: Dict[str, object]) -> Dict[str, str]:
     normalized: Dict[str, str] = {}
@@ -33,41 +58,213 @@ def _normalize_preset(obj: Dict[str, object]) -> Dict[str, str]:
         normalized[field] = str(value).strip() if value is not None else ""
     return normalized
 
-def load_presets_any(base_dir: str) -> List[Dict[str, str]]:
-    json_path = os.path.join(base_dir, "presets.json")
-    if not os.path.exists(json_path):
-        return []
-    try:
-        with open(json_path, encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            presets = [_normalize_preset(item) for item in data]
-            return [p for p in presets if p.get("id") and p.get("name")]
-    except Exception:
-        return []
-    return []
-
 def _presets_path(base_dir: str) -> str:
     return os.path.join(base_dir, "presets.json")
 
-def _write_presets(base_dir: str, presets: List[Dict[str, str]]) -> None:
-    path = _presets_path(base_dir)
-    tmp_path = path + ".tmp"
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(presets, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-    # Atomic-ish replace on most platforms
+# (mtime_ns, size), or None when the file is missing
+FileStamp = Optional[Tuple[int, int]]
+
+def _stamp(path: str) -> FileStamp:
     try:
-        os.replace(tmp_path, path)
-    except Exception:
-        # Fallback for stubborn operating systems
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class PresetStore:
+    """Presets of one presets.json, indexed by id and shared by the threads of a process."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict[str, str]] = {}
+        self._presets_stamp: FileStamp = None
+        self._journal_stamp: FileStamp = None
+        # Bytes of the journal already applied and entries in them
+        self._journal_offset = 0
+        self._journal_entries = 0
+        # presets.json changed after the journal was started
+        self._journal_stale = False
+        self._loaded = False
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a+b") as fh:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _is_current(self) -> bool:
+        return (
+            self._loaded
+            and _stamp(self.path) == self._presets_stamp
+            and _stamp(self.journal_path) == self._journal_stamp
+        )
+
+    def _refresh(self) -> None:
+        # Caller holds the file lock
+        presets_stamp = _stamp(self.path)
+        journal_stamp = _stamp(self.journal_path)
+        if self._loaded and presets_stamp == self._presets_stamp:
+            if journal_stamp == self._journal_stamp:
+                return
+            if journal_stamp is not None and journal_stamp[1] > self._journal_offset > 0:
+                # Only new lines were appended
+                self._read_journal(presets_stamp, self._journal_offset)
+                self._journal_stamp = journal_stamp
+                return
+        self._by_id = self._read_presets()
+        self._presets_stamp = presets_stamp
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._journal_stale = False
+        self._read_journal(presets_stamp, 0)
+        self._journal_stamp = journal_stamp
+        self._loaded = True
+
+    def _read_presets(self) -> Dict[str, Dict[str, str]]:
+        by_id: Dict[str, Dict[str, str]] = {}
         try:
-            os.remove(path)
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
         except Exception:
-            pass
-        os.rename(tmp_path, path)
+            return by_id
+        if isinstance(data, list):
+            for item in data:
+                preset = _normalize_preset(item)
+                if preset.get("id") and preset.get("name"):
+                    by_id[preset["id"]] = preset
+        return by_id
+
+    def _read_journal(self, presets_stamp: FileStamp, offset: int) -> None:
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return
+        # A line without its newline is still being written
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            if "base" in entry:
+                if presets_stamp is None or entry["base"] != list(presets_stamp):
+                    # Started against another presets.json, replay it over this one anyway
+                    self._journal_stale = True
+            elif entry.get("op") == "put" and isinstance(entry.get("preset"), dict):
+                preset = _normalize_preset(entry["preset"])
+                self._by_id[preset["id"]] = preset
+                self._journal_entries += 1
+            elif entry.get("op") == "delete":
+                self._by_id.pop(str(entry.get("id", "")), None)
+                self._journal_entries += 1
+        self._journal_offset = offset + end
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        # Caller holds the exclusive lock and has refreshed
+        if (
+            self._journal_offset <= 0
+            or self._journal_stale
+            or self._journal_entries >= max(MIN_JOURNAL_ENTRIES, len(self._by_id))
+        ):
+            # No journal yet, one started against an older presets.json, or it has grown past the presets: fold it in
+            self._compact()
+        line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+        with open(self.journal_path, "ab") as f:
+            f.write(line)
+        self._journal_offset += len(line)
+        self._journal_entries += 1
+        self._journal_stamp = _stamp(self.journal_path)
+
+    def _compact(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Only the holder of the exclusive lock gets here, so a fixed name is safe
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._by_id.values()), f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._presets_stamp = _stamp(self.path)
+        header = json.dumps({"base": list(self._presets_stamp or (0, 0))}).encode("utf-8") + b"\n"
+        with open(self.journal_path, "wb") as f:
+            f.write(header)
+        self._journal_offset = len(header)
+        self._journal_entries = 0
+        self._journal_stale = False
+        self._journal_stamp = _stamp(self.journal_path)
+
+    def _ensure_current(self) -> None:
+        with self._lock:
+            if self._is_current():
+                return
+            with self._file_lock(exclusive=False):
+                self._refresh()
+
+    def all(self) -> List[Dict[str, str]]:
+        self._ensure_current()
+        with self._lock:
+            return [dict(preset) for preset in self._by_id.values()]
+
+    def get(self, preset_id: str) -> Optional[Dict[str, str]]:
+        self._ensure_current()
+        with self._lock:
+            preset = self._by_id.get(preset_id)
+            return dict(preset) if preset is not None else None
+
+    def put(self, preset: Dict[str, str]) -> None:
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            self._append({"op": "put", "preset": preset})
+            self._by_id[preset["id"]] = preset
+
+    def delete(self, preset_id: str) -> bool:
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            if preset_id not in self._by_id:
+                return False
+            self._append({"op": "delete", "id": preset_id})
+            del self._by_id[preset_id]
+            return True
+
+_stores: Dict[str, PresetStore] = {}
+_stores_lock = threading.Lock()
+
+def get_preset_store(base_dir: str) -> PresetStore:
+    path = os.path.abspath(_presets_path(base_dir))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = PresetStore(path)
+            _stores[path] = store
+        return store
+
+def load_presets_any(base_dir: str) -> List[Dict[str, str]]:
+    return get_preset_store(base_dir).all()
+
+def get_preset(base_dir: str, preset_id: str) -> Optional[Dict[str, str]]:
+    return get_preset_store(base_dir).get((preset_id or "").strip())
 
 def save_or_update_preset(base_dir: str, preset: Dict[str, str]) -> Dict[str, str]:
     if not isinstance(preset, dict):
@@ -78,25 +275,11 @@ def save_or_update_preset(base_dir: str, preset: Dict[str, str]) -> Dict[str, st
     if not pid or not pname:
         raise ValueError("Both 'id' and 'name' are required")
 
-    items = load_presets_any(base_dir)
-    updated = False
-    for i, it in enumerate(items):
-        if it.get("id") == pid:
-            items[i] = normalized
-            updated = True
-            break
-    if not updated:
-        items.append(normalized)
-    _write_presets(base_dir, items)
+    get_preset_store(base_dir).put(normalized)
     return normalized
 
 def delete_preset(base_dir: str, preset_id: str) -> bool:
     preset_id = (preset_id or "").strip()
     if not preset_id:
         raise ValueError("preset_id is required")
-    items = load_presets_any(base_dir)
-    new_items = [it for it in items if it.get("id") != preset_id]
-    if len(new_items) == len(items):
-        return False
-    _write_presets(base_dir, new_items)
-    return True
+    return get_preset_store(base_dir).delete(preset_id)
@@ -0,0 +1,173 @@
+# scraper-webUI
+# Opt-in profiling of single scrapes
+# profiling.py
+# By G0246
+
+# A scrape run with profile=1 goes through cProfile. The standard library has
+# no sampling profiler, so this is the deterministic one, which slows the
+# scrape down but counts every call. cProfile only sees the thread that turned
+# it on, and scrapes do much of their work on pool threads (next page
+# prefetch, template windows, detail pages), so while a profile is running
+# every newly started thread gets a profiler of its own and the results are
+# merged at the end. threading.setprofile is process-wide, so profiled scrapes
+# run one at a time and other threads started meanwhile show up too. A thread
+# that outlives the profile (a job worker started meanwhile) unhooks its
+# profiler at its next call. From Python 3.12 cProfile sits on sys.monitoring,
+# which sees every thread and allows only one profiler at a time, so there a
+# single profiler covers the scrape and its threads.
+#
+# Profiles are kept as .pstats files, one per result id, and the oldest are
+# dropped past ``max_entries``.
+
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import tempfile
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+_profiling_lock = threading.Lock()
+
+# Before 3.12 a cProfile only sees the thread that enabled it
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+class ScrapeProfiler:
+    """Context manager profiling the calling thread and the threads it starts."""
+
+    def __init__(self) -> None:
+        self._main = cProfile.Profile()
+        self._threads: List[cProfile.Profile] = []
+        self._threads_lock = threading.Lock()
+        self._active = False
+
+    def _thread_timer(self) -> float:
+        # Only the profiled thread can unhook its profiler, so it checks on every event
+        if not self._active:
+            sys.setprofile(None)
+        return time.perf_counter()
+
+    def _start_in_thread(self, frame: Any, event: str, arg: Any) -> None:
+        # First profile event of a new thread: swap this hook for a real profiler
+        if not self._active:
+            sys.setprofile(None)
+            return
+        profile = cProfile.Profile(self._thread_timer)
+        with self._threads_lock:
+            self._threads.append(profile)
+        profile.enable()
+
+    def __enter__(self) -> "ScrapeProfiler":
+        _profiling_lock.acquire()
+        try:
+            self._main.enable()
+        except ValueError:
+            # Another profiling tool is already active
+            _profiling_lock.release()
+            raise
+        self._active = True
+        if _PER_THREAD_PROFILES:
+            threading.setprofile(self._start_in_thread)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._main.disable()
+        self._active = False
+        if _PER_THREAD_PROFILES:
+            threading.setprofile(None)  # type: ignore[arg-type]
+        with self._threads_lock:
+            for profile in self._threads:
+                profile.disable()
+        _profiling_lock.release()
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._main)
+        with self._threads_lock:
+            for profile in self._threads:
+                stats.add(profile)
+        return stats
+
+def top_functions(stats: pstats.Stats, limit: int = 30) -> List[Dict[str, Any]]:
+    """The ``limit`` functions with the most cumulative time, as plain rows."""
+    rows = []
+    for (filename, line, function), (primitive_calls, calls, own_time, cumulative, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append({
+            "function": function,
+            "location": f"{filename}:{line}" if line else filename,
+            "calls": calls if calls == primitive_calls else f"{calls}/{primitive_calls}",
+            "own_ms": round(own_time * 1000, 2),
+            "cumulative_ms": round(cumulative * 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class ProfileStore:
+    """Directory of .pstats files keyed by profile id, capped at ``max_entries`` files."""
+
+    def __init__(self, directory: str, max_entries: int = 50) -> None:
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id or ""):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.pstats")
+
+    def save(self, profile_id: str, stats: pstats.Stats) -> None:
+        path = self.path(profile_id)
+        if path is None:
+            raise ValueError("Invalid profile id.")
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            stats.dump_stats(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._prune()
+
+    def captured_at(self, profile_id: str) -> Optional[float]:
+        """Wall-clock time the profile was saved, or None when there is none."""
+        path = self.path(profile_id)
+        try:
+            return os.stat(path).st_mtime if path is not None else None
+        except OSError:
+            return None
+
+    def load(self, profile_id: str) -> Optional[pstats.Stats]:
+        path = self.path(profile_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            return pstats.Stats(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def _prune(self) -> None:
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".pstats")]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        def mtime(name: str) -> float:
+            try:
+                return os.stat(os.path.join(self.directory, name)).st_mtime
+            except OSError:
+                return 0.0
+        for name in sorted(names, key=mtime)[: len(names) - self.max_entries]:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
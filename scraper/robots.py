@@ -0,0 +1,203 @@
+# scraper-webUI
+# robots.txt fetching and caching
+# robots.py
+# By G0246
+
+# One parsed robots.txt per origin, fetched through the shared pooled client
+# with a timeout. Outcomes are cached for a while, failures included, so a
+# host with a broken robots.txt is not asked again on every request.
+# Concurrent lookups for the same origin wait on a single fetch.
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urlparse
+
+from scraper.client import new_session
+
+ROBOTS_TTL = float(os.environ.get("SCRAPER_ROBOTS_TTL", "3600"))
+# Unreachable hosts and 5xx answers are retried sooner than real files
+ROBOTS_FAILURE_TTL = float(os.environ.get("SCRAPER_ROBOTS_FAILURE_TTL", "300"))
+ROBOTS_MAX_ENTRIES = int(os.environ.get("SCRAPER_ROBOTS_MAX_ENTRIES", "512"))
+ROBOTS_TIMEOUT = float(os.environ.get("SCRAPER_ROBOTS_TIMEOUT", "10"))
+
+@dataclass
+class _RobotsEntry:
+    parser: robotparser.RobotFileParser
+    expires_at: float
+    failed: bool = False
+    # (user agents, delay) per group; RobotFileParser only keeps whole-second delays
+    crawl_delays: List[Tuple[List[str], float]] = field(default_factory=list)
+
+def _parse_crawl_delays(lines: List[str]) -> List[Tuple[List[str], float]]:
+    groups: List[Tuple[List[str], float]] = []
+    agents: List[str] = []
+    in_rules = False
+    for raw in lines:
+        line = raw.split("#", 1)[0].strip()
+        name, _, value = line.partition(":")
+        name, value = name.strip().lower(), value.strip()
+        if name == "user-agent":
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+        elif name in ("allow", "disallow", "crawl-delay", "request-rate"):
+            in_rules = True
+            if name == "crawl-delay" and agents:
+                try:
+                    groups.append((list(agents), max(0.0, float(value))))
+                except ValueError:
+                    pass
+    return groups
+
+def _agent_delay(groups: List[Tuple[List[str], float]], user_agent: str) -> Optional[float]:
+    # Same matching as RobotFileParser: first named group that applies, then "*"
+    token = user_agent.split("/")[0].lower()
+    fallback: Optional[float] = None
+    for agents, delay in groups:
+        for agent in agents:
+            if agent == "*":
+                if fallback is None:
+                    fallback = delay
+            elif agent in token:
+                return delay
+    return fallback
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    entry: Optional[_RobotsEntry] = None
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+class RobotsCache:
+    """TTL + LRU cache of parsed robots.txt files, keyed by origin."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = ROBOTS_TTL,
+        failure_ttl_seconds: float = ROBOTS_FAILURE_TTL,
+        max_entries: int = ROBOTS_MAX_ENTRIES,
+        timeout: float = ROBOTS_TIMEOUT,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.timeout = timeout
+        self._entries: "OrderedDict[str, _RobotsEntry]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.failures = 0
+        self.coalesced = 0
+
+    def _fetch(self, origin: str, user_agent: str) -> _RobotsEntry:
+        parser = robotparser.RobotFileParser(origin + "/robots.txt")
+        failed = False
+        crawl_delays: List[Tuple[List[str], float]] = []
+        try:
+            resp = new_session({"User-Agent": user_agent}).get(origin + "/robots.txt", timeout=self.timeout)
+            # Same rules as RobotFileParser.read()
+            if resp.status_code in (401, 403):
+                parser.disallow_all = True
+            elif 400 <= resp.status_code < 500:
+                parser.allow_all = True
+            elif resp.status_code >= 500:
+                parser.disallow_all = True
+                failed = True
+            else:
+                lines = resp.text.splitlines()
+                parser.parse(lines)
+                crawl_delays = _parse_crawl_delays(lines)
+        except Exception:
+            # Unreachable robots.txt never blocked a scrape before, keep it that way
+            parser.allow_all = True
+            failed = True
+        parser.modified()
+        ttl = self.failure_ttl_seconds if failed else self.ttl_seconds
+        return _RobotsEntry(parser=parser, expires_at=time.monotonic() + ttl, failed=failed, crawl_delays=crawl_delays)
+
+    def _entry(self, url: str, user_agent: str) -> _RobotsEntry:
+        origin = _origin(url)
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(origin)
+                self.hits += 1
+                return entry
+            flight = self._inflight.get(origin)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[origin] = flight
+                self.fetches += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait(self.timeout * 2)
+            if flight.entry is not None:
+                return flight.entry
+            return self._entry(url, user_agent)
+
+        try:
+            entry = self._fetch(origin, user_agent)
+            with self._lock:
+                if entry.failed:
+                    self.failures += 1
+                self._entries.pop(origin, None)
+                self._entries[origin] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            flight.entry = entry
+            return entry
+        finally:
+            with self._lock:
+                self._inflight.pop(origin, None)
+            flight.done.set()
+
+    def get(self, url: str, user_agent: str = "scraper-webUI") -> robotparser.RobotFileParser:
+        return self._entry(url, user_agent).parser
+
+    def can_fetch(self, url: str, user_agent: str = "scraper-webUI") -> bool:
+        try:
+            return self.get(url, user_agent).can_fetch(user_agent, url)
+        except Exception:
+            return True
+
+    def crawl_delay(self, url: str, user_agent: str = "scraper-webUI") -> Optional[float]:
+        try:
+            return _agent_delay(self._entry(url, user_agent).crawl_delays, user_agent)
+        except Exception:
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "failure_ttl_seconds": self.failure_ttl_seconds,
+                "hits": self.hits,
+                "fetches": self.fetches,
+                "failures": self.failures,
+                "coalesced": self.coalesced,
+            }
+
+_robots = RobotsCache()
+
+def get_robots_cache() -> RobotsCache:
+    return _robots
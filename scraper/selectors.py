@@ -0,0 +1,238 @@
+# scraper-webUI
+# Selector analysis for the fast parsing paths
+# selectors.py
+# By G0246
+
+# Most selectors people type are simple: a tag, a class, an id, maybe an
+# attribute, joined by descendant or child combinators (".quote .text",
+# "li.next > a", "#image"). For those we can skip work: build a SoupStrainer so
+# bs4 only keeps the relevant subtrees, or go straight to lxml with a compiled
+# XPath. Anything fancier (pseudo-classes, sibling combinators, escapes) makes
+# parse_simple_selector return None and callers fall back to full bs4 parsing.
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import SoupStrainer
+from lxml import etree
+
+_IDENT = r"-?[A-Za-z_][\w-]*"
+_TOKEN = re.compile(
+    r"\s*(?P<comb>>)\s*"
+    r"|(?P<ws>\s+)"
+    r"|(?P<tag>\*|" + _IDENT + r")"
+    r"|#(?P<id>" + _IDENT + r")"
+    r"|\.(?P<cls>" + _IDENT + r")"
+    r"|\[\s*(?P<attr>" + _IDENT + r")\s*(?:(?P<op>[~^*]?=)\s*(?P<val>\"[^\"]*\"|'[^']*'|" + _IDENT + r")\s*)?\]"
+)
+
+@dataclass(frozen=True)
+class Compound:
+    tag: Optional[str] = None
+    id: Optional[str] = None
+    classes: Tuple[str, ...] = ()
+    attrs: Tuple[Tuple[str, Optional[str], Optional[str]], ...] = ()
+
+# A chain is ((combinator, compound), ...) where the first combinator is ""
+Chain = Tuple[Tuple[str, Compound], ...]
+
+def _parse_chain(text: str) -> Optional[Chain]:
+    chain: List[Tuple[str, Compound]] = []
+    pos = 0
+    combinator = ""
+    parts: Dict[str, Any] = {}
+    text = text.strip()
+
+    def flush() -> None:
+        if parts:
+            chain.append((combinator, Compound(
+                tag=parts.get("tag"),
+                id=parts.get("id"),
+                classes=tuple(parts.get("classes", ())),
+                attrs=tuple(parts.get("attrs", ())),
+            )))
+
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            return None
+        pos = match.end()
+        if match.group("comb") is not None or match.group("ws") is not None:
+            if not parts:
+                return None
+            flush()
+            parts = {}
+            combinator = ">" if match.group("comb") is not None else " "
+        elif match.group("tag") is not None:
+            if parts:
+                return None  # Type selector has to come first in a compound
+            tag = match.group("tag").lower()
+            parts["tag"] = None if tag == "*" else tag
+        elif match.group("id") is not None:
+            if "id" in parts:
+                return None
+            parts["id"] = match.group("id")
+        elif match.group("cls") is not None:
+            parts.setdefault("classes", []).append(match.group("cls"))
+        else:
+            value = match.group("val")
+            if value and value[0] in "\"'":
+                value = value[1:-1]
+            parts.setdefault("attrs", []).append((match.group("attr").lower(), match.group("op"), value))
+    if not parts:
+        return None
+    flush()
+    return tuple(chain)
+
+@lru_cache(maxsize=256)
+def parse_simple_selector(css: str) -> Optional[Tuple[Chain, ...]]:
+    """Parse a selector group made only of simple compounds, else return None."""
+    if not css or not css.strip():
+        return None
+    chains = []
+    for part in css.split(","):
+        chain = _parse_chain(part)
+        if chain is None:
+            return None
+        chains.append(chain)
+    return tuple(chains)
+
+def _attr_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(value)
+    return "" if value is None else str(value)
+
+def compound_matches(compound: Compound, name: str, attrs: Dict[str, Any]) -> bool:
+    if compound.tag and (name or "").lower() != compound.tag:
+        return False
+    if compound.id and _attr_text(attrs.get("id")) != compound.id:
+        return False
+    if compound.classes:
+        have = set(_attr_text(attrs.get("class")).split())
+        if not all(c in have for c in compound.classes):
+            return False
+    for attr, op, value in compound.attrs:
+        if attr not in attrs:
+            return False
+        if op is None:
+            continue
+        actual = _attr_text(attrs.get(attr))
+        if op == "=" and actual != value:
+            return False
+        if op == "~=" and value not in actual.split():
+            return False
+        if op == "^=" and not (value and actual.startswith(value)):
+            return False
+        if op == "*=" and not (value and value in actual):
+            return False
+    return True
+
+def build_strainer(*selectors: Optional[str]) -> Optional[SoupStrainer]:
+    """SoupStrainer keeping only subtrees that can contain a match for any selector.
+
+    Every match of a chain lives under (or is) an element matching the chain's
+    first compound, so those elements are all we need to keep. Returns None if
+    any selector is not simple.
+    """
+    roots: List[Compound] = []
+    for css in selectors:
+        if not css:
+            continue
+        chains = parse_simple_selector(css)
+        if chains is None:
+            return None
+        roots.extend(chain[0][1] for chain in chains)
+    if not roots:
+        return None
+
+    def keep(name: Any, attrs: Optional[Dict[str, Any]] = None) -> bool:
+        if not isinstance(name, str):
+            return False
+        return any(compound_matches(root, name, attrs or {}) for root in roots)
+
+    return SoupStrainer(keep)
+
+def _chain_matches(chain: Chain, position: int, element: Any) -> bool:
+    combinator, compound = chain[position]
+    if not isinstance(element.tag, str) or not compound_matches(compound, element.tag, element.attrib):
+        return False
+    if position == 0:
+        return True
+    parent = element.getparent()
+    if combinator == ">":
+        return parent is not None and _chain_matches(chain, position - 1, parent)
+    while parent is not None:
+        if _chain_matches(chain, position - 1, parent):
+            return True
+        parent = parent.getparent()
+    return False
+
+def element_matches(chains: Tuple[Chain, ...], element: Any) -> bool:
+    """Match an lxml element against parsed chains, looking only at it and its ancestors.
+
+    That is all descendant and child combinators need, so it works on an
+    element as soon as its start tag has been parsed.
+    """
+    return any(_chain_matches(chain, len(chain) - 1, element) for chain in chains)
+
+def _xpath_literal(value: str) -> Optional[str]:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return None
+
+def _compound_to_xpath(compound: Compound) -> Optional[str]:
+    step = compound.tag or "*"
+    if compound.id:
+        literal = _xpath_literal(compound.id)
+        if literal is None:
+            return None
+        step += f"[@id={literal}]"
+    for cls in compound.classes:
+        step += f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+    for attr, op, value in compound.attrs:
+        if op is None:
+            step += f"[@{attr}]"
+            continue
+        literal = _xpath_literal(value or "")
+        if literal is None:
+            return None
+        if op == "=":
+            step += f"[@{attr}={literal}]"
+        elif op == "~=":
+            step += f"[contains(concat(' ', normalize-space(@{attr}), ' '), concat(' ', {literal}, ' '))]"
+        elif op == "^=":
+            step += f"[string-length({literal}) > 0 and starts-with(@{attr}, {literal})]"
+        elif op == "*=":
+            step += f"[string-length({literal}) > 0 and contains(@{attr}, {literal})]"
+    return step
+
+@lru_cache(maxsize=256)
+def css_to_xpath(css: str) -> Optional[str]:
+    """Translate a simple selector group to an equivalent document-wide XPath."""
+    chains = parse_simple_selector(css)
+    if chains is None:
+        return None
+    alternatives = []
+    for chain in chains:
+        path = ""
+        for combinator, compound in chain:
+            step = _compound_to_xpath(compound)
+            if step is None:
+                return None
+            path += ("/" if combinator == ">" else "//") + step
+        alternatives.append(path)
+    return " | ".join(alternatives)
+
+@lru_cache(maxsize=512)
+def compile_xpath(expression: str) -> etree.XPath:
+    """Compile an XPath once per expression string and reuse it afterwards.
+
+    String results come back as plain str, so they do not pin the parsed tree.
+    """
+    return etree.XPath(expression, smart_strings=False)